@@ -0,0 +1,246 @@
+"""Columnar analytics over archives of saved games.
+
+``ingest`` streams a directory of save files (``business_simulation.json`` or
+the compressed ``.ceo`` format, both read with ``models.decode_saved``) into a
+Parquet dataset with one row per round (``rounds/``) and one row per game
+(``games/``). A game is identified by the SHA-1 of its file's content, so
+re-running the ingest over a growing archive only decodes new files; every run
+adds part files and never rewrites existing ones. Each flush writes a rounds
+part and then a games part of the same name, and readers skip rounds parts
+whose games part is missing, so an ingest killed between the two leaves no
+rows behind and its games are ingested again in full. ``report`` runs vectorized
+pandas aggregations over the whole dataset: correct-answer rate by
+difficulty, per-round metric trajectories and the distribution of bankruptcy
+rounds.
+
+    python analytics.py ingest saves/ --dataset cohort
+    python analytics.py report --dataset cohort --out report.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import uuid
+
+import pandas as pd
+
+import game
+import models
+
+save_suffixes = (".json", ".ceo")
+
+round_columns = ["game_id", "round", "difficulty", "choice", "correct_option", "correct"] + game.metrics
+game_columns = (["game_id", "file", "difficulty", "total_rounds", "rounds_played", "bankrupt_round", "correct_answers"]
+                + [f"initial_{metric}" for metric in game.metrics] + [f"final_{metric}" for metric in game.metrics])
+
+# Low-cardinality text columns stored as dictionaries
+category_columns = ["difficulty", "choice", "correct_option"]
+
+# Function to list the save files under a directory, recursively and in a stable order
+def iter_save_files(root):
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(files):
+            if name.endswith(save_suffixes):
+                yield os.path.join(directory, name)
+
+# Function to list the part files of one table whose flush completed, i.e. whose games part exists
+def committed_parts(dataset, table):
+    games = os.path.join(dataset, "games")
+    if not os.path.isdir(games):
+        return []
+    names = sorted(name for name in os.listdir(games) if name.endswith(".parquet"))
+    directory = os.path.join(dataset, table)
+    return [os.path.join(directory, name) for name in names if os.path.exists(os.path.join(directory, name))]
+
+# Function to read the ids (content hashes) of the games already in a dataset
+def ingested_ids(dataset):
+    parts = committed_parts(dataset, "games")
+    if not parts:
+        return set()
+    return set(pd.read_parquet(parts, columns=["game_id"])["game_id"])
+
+class DatasetWriter:
+    """Buffers ingested games column by column and writes them as Parquet parts."""
+
+    def __init__(self, dataset, batch_games=5000):
+        self.dataset = dataset
+        self.batch_games = batch_games
+        self.run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.parts = 0
+        self._reset()
+
+    def _reset(self):
+        self.games = {column: [] for column in game_columns}
+        self.rounds = {column: [] for column in round_columns}
+
+    # Buffer one game; its rows are built in full first, so a bad record leaves the buffers untouched
+    def add(self, game_id, file, saved):
+        history = saved.get("history", [])
+        difficulty = saved.get("difficulty", "Medium")
+        rounds = {column: [] for column in round_columns}
+        correct_answers = 0
+        for record in history:
+            correct_option = record.get("correct_option")
+            correct = record["choice"] == correct_option if correct_option else None
+            correct_answers += bool(correct)
+            rounds["game_id"].append(game_id)
+            rounds["round"].append(record["round"])
+            # Saves from before replay support only know the game's difficulty
+            rounds["difficulty"].append(record.get("difficulty") or difficulty)
+            rounds["choice"].append(record["choice"])
+            rounds["correct_option"].append(correct_option)
+            rounds["correct"].append(correct)
+            for metric in game.metrics:
+                rounds[metric].append(record[metric])
+        row = {
+            "game_id": game_id,
+            "file": file,
+            "difficulty": difficulty,
+            "total_rounds": saved.get("total_rounds", game.default_rounds),
+            "rounds_played": len(history),
+            # The game only ends early on bankruptcy, in the last recorded round
+            "bankrupt_round": len(history) if saved.get("game_over") else 0,
+            "correct_answers": correct_answers,
+            **{f"initial_{metric}": saved["initial_company"][metric] for metric in game.metrics},
+            **{f"final_{metric}": saved["company"][metric] for metric in game.metrics}
+        }
+        for column in round_columns:
+            self.rounds[column].extend(rounds[column])
+        for column in game_columns:
+            self.games[column].append(row[column])
+        if len(self.games["game_id"]) >= self.batch_games:
+            self.flush()
+
+    def flush(self):
+        if not self.games["game_id"]:
+            return
+        rounds = pd.DataFrame(self.rounds, columns=round_columns)
+        rounds["correct"] = rounds["correct"].astype("boolean")
+        games = pd.DataFrame(self.games, columns=game_columns)
+        # Rounds land first: the part, and its games, count as ingested only once the games file exists
+        for table, frame in (("rounds", rounds), ("games", games)):
+            for column in category_columns:
+                if column in frame:
+                    frame[column] = frame[column].astype("category")
+            directory = os.path.join(self.dataset, table)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{self.run_id}-{self.parts:05d}.parquet")
+            frame.to_parquet(path + ".tmp", index=False)
+            os.replace(path + ".tmp", path)
+        self.parts += 1
+        self._reset()
+
+# Function to ingest every new save file under source into the dataset; returns counts per outcome
+def ingest(source, dataset, batch_games=5000):
+    known = ingested_ids(dataset)
+    writer = DatasetWriter(dataset, batch_games)
+    counts = {"ingested": 0, "skipped": 0, "empty": 0, "invalid": 0}
+    for path in iter_save_files(source):
+        with open(path, "rb") as f:
+            data = f.read()
+        game_id = hashlib.sha1(data).hexdigest()
+        if game_id in known:
+            counts["skipped"] += 1
+            continue
+        known.add(game_id)
+        try:
+            saved = models.decode_saved(data)
+        except (ValueError, UnicodeDecodeError) as e:
+            print(f"{path}: {e}", file=sys.stderr)
+            counts["invalid"] += 1
+            continue
+        # Saved before a company profile was generated
+        if not saved.get("company") or not saved.get("initial_company"):
+            counts["empty"] += 1
+            continue
+        try:
+            writer.add(game_id, os.path.relpath(path, source), saved)
+        except (KeyError, TypeError) as e:
+            print(f"{path}: campo inválido {e}", file=sys.stderr)
+            counts["invalid"] += 1
+            continue
+        counts["ingested"] += 1
+    writer.flush()
+    return counts
+
+# Function to load one table of the dataset ("rounds" or "games"), optionally only some columns
+def load(dataset, table, columns=None):
+    parts = committed_parts(dataset, table)
+    if not parts:
+        return pd.DataFrame(columns=columns or (round_columns if table == "rounds" else game_columns))
+    return pd.read_parquet(parts, columns=columns)
+
+# Share of rounds answered correctly per difficulty, over rounds whose correct option is known
+def correct_rate_by_difficulty(rounds):
+    known = rounds[rounds["correct"].notna()]
+    grouped = known["correct"].astype(float).groupby(known["difficulty"].astype(str))
+    frame = pd.DataFrame({"rounds": grouped.size(), "correct_rate": grouped.mean()})
+    return frame.reindex([difficulty for difficulty in game.difficulties if difficulty in frame.index])
+
+# Mean and quantiles of every metric after each round, across games
+def metric_trajectories(rounds, metrics=None, quantiles=(0.1, 0.5, 0.9)):
+    grouped = rounds.groupby("round")[list(metrics or game.metrics)]
+    stats = {"mean": grouped.mean(), **{f"p{round(q * 100)}": grouped.quantile(q) for q in quantiles}}
+    return pd.concat(stats, axis=1)
+
+# Games that went bankrupt in each round, per difficulty
+def bankruptcy_distribution(games):
+    bankrupt = games[games["bankrupt_round"] > 0]
+    return bankrupt.groupby([bankrupt["bankrupt_round"], bankrupt["difficulty"].astype(str)]).size().unstack(fill_value=0)
+
+# Games, bankruptcy rate and mean correct answers per game, per difficulty
+def games_by_difficulty(games):
+    grouped = games.groupby(games["difficulty"].astype(str))
+    return pd.DataFrame({
+        "games": grouped.size(),
+        "bankruptcy_rate": (games["bankrupt_round"] > 0).groupby(games["difficulty"].astype(str)).mean(),
+        "rounds_played_mean": grouped["rounds_played"].mean(),
+        "correct_answers_mean": grouped["correct_answers"].mean()
+    }).reindex([difficulty for difficulty in game.difficulties if difficulty in grouped.groups])
+
+# Function to build the cohort report as plain dicts
+def report(dataset):
+    rounds = load(dataset, "rounds", ["round", "difficulty", "correct"] + game.metrics)
+    games = load(dataset, "games", ["difficulty", "rounds_played", "bankrupt_round", "correct_answers"])
+    trajectories = metric_trajectories(rounds)
+    return {
+        "games": len(games),
+        "rounds": len(rounds),
+        "by_difficulty": games_by_difficulty(games).to_dict(orient="index"),
+        "correct_rate_by_difficulty": correct_rate_by_difficulty(rounds).to_dict(orient="index"),
+        "bankruptcy_rounds": {str(round_number): row for round_number, row in bankruptcy_distribution(games).to_dict(orient="index").items()},
+        "metric_trajectories": {
+            f"{stat}_{metric}": dict(zip(trajectories.index.tolist(), trajectories[stat, metric].tolist()))
+            for stat, metric in trajectories.columns
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar dataset and cohort reports over saved games")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = commands.add_parser("ingest", help="add new save files under a directory to the dataset")
+    ingest_parser.add_argument("source", help="directory of .json/.ceo save files, searched recursively")
+    ingest_parser.add_argument("--dataset", required=True, help="dataset directory (created if missing)")
+    ingest_parser.add_argument("--batch-games", type=int, default=5000, help="games per Parquet part file")
+    report_parser = commands.add_parser("report", help="aggregate the dataset into a JSON report")
+    report_parser.add_argument("--dataset", required=True)
+    report_parser.add_argument("--out", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.command == "ingest":
+        result = ingest(args.source, args.dataset, args.batch_games)
+    else:
+        result = report(args.dataset)
+    result["elapsed_seconds"] = time.perf_counter() - started
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    print(text)
+    if getattr(args, "out", None):
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+
+if __name__ == "__main__":
+    main()
@@ -1,87 +1,222 @@
 import streamlit as st
-import google.generativeai as genai
 import random
 import json
-import time
 import copy
-import pandas as pd
-import io
+import collections
+import concurrent.futures
+import functools
+import hashlib
+import time
+import re
+import uuid
+import game
+import prompts
+import prefetch
+import challenge_cache
+import challenge_queue
+import llm
+import streaming
+import metrics
+import series
+import replay
+import models
+import schema
+import sessions
+
+# Instrumentation (configure enabled, jsonl_path, prometheus_port and debug_panel under [metrics] in secrets)
+metrics_settings = dict(st.secrets.get("metrics", {}))
+metrics.configure(**metrics_settings)
+if metrics_settings.get("prometheus_port"):
+    metrics.serve_prometheus(int(metrics_settings["prometheus_port"]))
+
+# Shared LLM client for every session of this process (configure under [llm] in secrets)
+@st.cache_resource
+def get_llm_client():
+    settings = dict(st.secrets.get("llm", {}))
+    if settings.pop("backend", "gemini") == "stub":
+        backend = llm.StubBackend(settings.pop("stub_latency", 0.05), settings.pop("stub_failure_rate", 0.0), chunk_delay=settings.pop("stub_chunk_delay", 0.0),
+                                  slow_rate=settings.pop("stub_slow_rate", 0.0), slow_latency=settings.pop("stub_slow_latency", 0.0))
+    else:
+        backend = llm.GeminiBackend(st.secrets["gemini"]["api_key"])
+    settings.pop("deadline", None)
+    client = llm.LLMClient(backend, **settings)
+    prefetch.configure(client.max_concurrency)
+    metrics.register_collector(lambda: {f"llm_client_{name}_total": value for name, value in client.stats.items()})
+    return client
+
+llm_client = get_llm_client()
+
+# Seconds a round transition or a new game may wait on Gemini before falling back; late responses are
+# kept for reuse (set deadline under [llm]; 0 waits indefinitely). Waiting calls are hedged at the p95 latency
+llm_deadline = float(st.secrets.get("llm", {}).get("deadline", 10.0)) or None
+
+# Function to give the seconds left before a time.monotonic() deadline (None when there is none)
+def seconds_left(expires):
+    return None if expires is None else max(0.0, expires - time.monotonic())
+
+# Profiles that arrived after their deadline, served to the next new games of this process
+@st.cache_resource
+def get_spare_profiles():
+    return collections.deque(maxlen=8)
+
+spare_profiles = get_spare_profiles()
+
+# Shared challenge cache across sessions (configure under [challenge_cache] in secrets)
+cache_settings = dict(st.secrets.get("challenge_cache", {}))
+challenge_store = None
+if cache_settings.pop("enabled", True):
+    challenge_store = challenge_cache.get_cache(cache_settings.pop("path", challenge_cache.DEFAULT_PATH), **cache_settings)
+
+# Batched challenge generation: size challenges per call, queued per session and dropped once
+# the company drifts past drift (configure size and drift under [challenge_batch]; size 0 disables)
+batch_settings = dict(st.secrets.get("challenge_batch", {}))
+batch_size = int(batch_settings.get("size", 0))
+batch_drift = float(batch_settings.get("drift", 0.15))
+
+# Pre-generated challenge bank served when Gemini is unavailable (build with challenge_bank.py, set path under [challenge_bank])
+@st.cache_resource
+def get_challenge_bank(path):
+    import challenge_bank  # NumPy is only loaded when a bank is configured
+    return challenge_bank.ChallengeBank(path)
+
+bank_path = st.secrets.get("challenge_bank", {}).get("path")
+bank = get_challenge_bank(bank_path) if bank_path else None
 
-# Configure Google Gemini API
-genai.configure(api_key=st.secrets["gemini"]["api_key"])
-model = genai.GenerativeModel("gemini-1.5-flash")
+# Write-through game persistence with a bounded number of sessions in memory
+# (configure enabled, path, max_resident, idle_seconds and min_idle_seconds under [session_store] in secrets)
+store_settings = dict(st.secrets.get("session_store", {}))
+session_store = None
+if store_settings.pop("enabled", True):
+    session_store = sessions.get_store(store_settings.pop("path", sessions.DEFAULT_PATH), **store_settings)
+    metrics.register_collector(session_store.gauges)
+
+# Function to put a saved or persisted game into the session state
+def apply_saved_state(state):
+    loaded = models.from_saved(state)
+    prefetch.discard_prefetch(game_state)
+    game_state.clear()
+    game_state.company = loaded["company"]
+    st.session_state.round = state["round"]
+    game_state.history = loaded["history"]
+    st.session_state.game_over = state["game_over"]
+    game_state.initial_company = loaded["initial_company"]
+    st.session_state.difficulty = state.get("difficulty", "Medium")
+    st.session_state.total_rounds = state.get("total_rounds", game.default_rounds)
+    st.session_state.page = state.get("page", "Perfil inicial de la empresa")
+    st.session_state.decision_made = state.get("decision_made", False)
+    game_state.decision_result = state.get("decision_result")
+    # Saves from before seeded rounds have no seed; later rounds still get one
+    st.session_state.game_seed = state["seed"] if state.get("seed") is not None else random.getrandbits(63)
+    if state.get("current_challenge"):
+        game_state.current_challenge = models.compact_challenge(state["current_challenge"])
+
+# The game's objects (company, history, challenge, series, caches) live in the session's GameState rather
+# than in st.session_state, so the session store can release an idle session's game from memory
+if "resident" not in st.session_state:
+    st.session_state.resident = sessions.Resident(None)
+    if session_store is not None:
+        # The id in the URL finds the game again after a reload or a server restart; a copied
+        # link whose game is still open elsewhere starts a copy under a new id instead
+        requested = st.query_params.get("sid", "")
+        requested = requested if re.fullmatch(r"[0-9a-f]{32}", requested) else None
+        if requested is None or not session_store.claim(requested, st.session_state.resident):
+            session_store.claim(uuid.uuid4().hex, st.session_state.resident)
+        st.session_state.session_id = st.session_state.resident.session_id
+        st.query_params["sid"] = st.session_state.session_id
+        st.session_state.load_from = requested
+game_state = st.session_state.resident.game
+
+# Function to read a session's last write back as a saved-state dict, or None; safe outside the script thread
+def load_persisted(session_id):
+    payload, records = session_store.load(session_id)
+    if not payload:
+        return None
+    state = models.decode_saved(payload)
+    # Sessions written before round rows keep their history in the header
+    if records:
+        state["history"] = [json.loads(record) for record in records]
+    return state
+
+if session_store is not None:
+    session_store.touch(st.session_state.resident)
+    # Rehydrate a new or released session from its last write
+    if "company" not in game_state:
+        load_from = st.session_state.pop("load_from", None) or st.session_state.session_id
+        with metrics.span("session_load"):
+            state = load_persisted(load_from)
+            if state:
+                apply_saved_state(state)
+                # A copied game is written in full under its new id
+                if load_from == st.session_state.session_id:
+                    game_state.persisted_rounds = len(state["history"])
 
 # Initialize session state
-if "company" not in st.session_state:
-    st.session_state.company = None
+if "company" not in game_state:
+    game_state.company = None
 if "round" not in st.session_state:
     st.session_state.round = 0
-if "history" not in st.session_state:
-    st.session_state.history = []
+if "history" not in game_state:
+    game_state.history = models.History()
 if "game_over" not in st.session_state:
     st.session_state.game_over = False
 if "decision_made" not in st.session_state:
     st.session_state.decision_made = False
-if "decision_result" not in st.session_state:
-    st.session_state.decision_result = None
-if "initial_company" not in st.session_state:
-    st.session_state.initial_company = None
+if "total_rounds" not in st.session_state:
+    st.session_state.total_rounds = game.default_rounds
+if "decision_result" not in game_state:
+    game_state.decision_result = None
+if "initial_company" not in game_state:
+    game_state.initial_company = None
 if "difficulty" not in st.session_state:
     st.session_state.difficulty = "Medium"
 if "page" not in st.session_state:
     st.session_state.page = "Perfil inicial de la empresa"
+if "state_version" not in st.session_state:
+    st.session_state.state_version = 0
 
 # Function to reset the game
 def reset_game():
-    keys = ["company", "round", "history", "game_over", "decision_made", "decision_result", "initial_company", "current_challenge", "difficulty", "page"]
+    keys = ["round", "game_over", "decision_made", "difficulty", "page", "game_seed"]
+    prefetch.discard_prefetch(game_state)
+    game_state.clear()
     for key in keys:
         if key in st.session_state:
             del st.session_state[key]
+    if session_store is not None:
+        session_store.delete(st.session_state.session_id)
     st.rerun()
 
-# Function to generate initial company profile using Gemini API with retries
+# Function to keep a profile that arrived after its deadline for a later game
+def keep_late_profile(response):
+    profile = schema.parse_profile(response)
+    if profile is not None:
+        spare_profiles.append(profile)
+
+# Function to generate initial company profile using Gemini API within the deadline, retrying malformed JSON
 def generate_company_profile(max_retries=3):
-    prompt = """
-    Genera un perfil detallado en español de una empresa mediana estable. Incluye exactamente los siguientes campos en formato JSON:
-    - "products": Descripción de productos o servicios ofrecidos (texto).
-    - "inventory": Descripción general del inventario (texto).
-    - "capital": Capital inicial en USD (número entero).
-    - "employees": Número de empleados (número entero).
-    - "personnel": Lista de objetos con "name" (nombre completo) y "role" (rol en la empresa). Incluye al menos: gerente comercial, gerente financiero, gerente de recursos humanos, gerente de relaciones públicas, gerente de marketing, gerente de operaciones, y otros puestos relevantes.
-    Ejemplo:
-    {
-      "products": "Software de gestión empresarial",
-      "inventory": "Licencias de software y servidores",
-      "capital": 500000,
-      "employees": 50,
-      "personnel": [
-        {"name": "Ana López", "role": "Gerente Comercial"},
-        {"name": "Carlos Pérez", "role": "Gerente Financiero"},
-        ...
-      ]
-    }
-    Devuelve solo el JSON, sin texto adicional.
-    """
-    for attempt in range(max_retries):
-        try:
-            response = model.generate_content(prompt)
-            return json.loads(response.text.strip("```json\n").strip("```"))
-        except (json.JSONDecodeError, Exception) as e:
-            if attempt == max_retries - 1:
-                st.error("No se pudo generar el perfil de la empresa. Usando datos predeterminados.")
-                return {
-                    "products": "Productos genéricos",
-                    "inventory": "Inventario estándar",
-                    "capital": 500000,
-                    "employees": 50,
-                    "personnel": [
-                        {"name": "Juan García", "role": "Gerente General"},
-                        {"name": "María Rodríguez", "role": "Gerente Comercial"},
-                        {"name": "Luis Fernández", "role": "Gerente Financiero"}
-                    ]
-                }
-            time.sleep(2 ** attempt)
-    return None
+    try:
+        return spare_profiles.popleft()
+    except IndexError:
+        pass
+    expires = None if llm_deadline is None else time.monotonic() + llm_deadline
+    with metrics.span("generate", kind="profile"):
+        for attempt in range(max_retries):
+            metrics.inc("generate_attempts_total", kind="profile")
+            try:
+                response = llm_client.generate(prompts.profile_prompt, seconds_left(expires), hedge=expires is not None,
+                                               on_late=keep_late_profile)
+            except llm.DeadlineExceeded:
+                metrics.inc("generate_deadline_exceeded_total", kind="profile")
+                break
+            except llm.LLMError:
+                break
+            profile = schema.parse_profile(response)
+            if profile is not None:
+                return profile
+            metrics.inc("generate_parse_failures_total", kind="profile")
+    metrics.inc("generate_fallbacks_total", kind="profile")
+    st.error("No se pudo generar el perfil de la empresa. Usando datos predeterminados.")
+    return copy.deepcopy(game.default_profile)
 
 # Function to format company profile as plain text
 def format_company_profile(company):
@@ -100,269 +235,388 @@ def format_company_profile(company):
     {personnel_text}
     """
 
-# Function to generate a dynamic fallback challenge
+# Function to generate a fallback challenge from the bank, or a dynamic one without a bank
 def create_fallback_challenge(company, difficulty):
-    scenarios = [
-        {
-            "description": "Un competidor lanza un producto similar a menor precio, amenazando tu cuota de mercado.",
-            "options": {
-                "A": "Invertir en marketing para destacar la calidad del producto.",
-                "B": "Mantener precios y observar el mercado.",
-                "C": "Reducir la calidad para bajar costos y competir en precio.",
-                "D": "Aumentar precios para posicionarte como premium."
-            },
-            "correct_option": "A",
-            "consequences": {
-                "A": "Tu inversión en marketing ha reforzado la percepción de calidad, atrayendo más clientes.",
-                "B": "Al no actuar, algunos clientes han migrado a la competencia, afectando tus ventas.",
-                "C": "Reducir la calidad ha generado quejas, dañando la satisfacción de clientes.",
-                "D": "El aumento de precios ha alejado a clientes sensibles al costo, reduciendo tu cuota de mercado."
-            }
-        },
-        {
-            "description": "Una queja viral en redes sociales afecta la satisfacción de clientes.",
-            "options": {
-                "A": "Responder públicamente y ofrecer una solución inmediata.",
-                "B": "Ignorar el problema, esperando que pase desapercibido.",
-                "C": "Demandar a los responsables por difamación.",
-                "D": "Reducir la interacción en redes sociales."
-            },
-            "correct_option": "A",
-            "consequences": {
-                "A": "Tu respuesta rápida ha restaurado la confianza, mejorando la percepción de los clientes.",
-                "B": "Ignorar la queja ha amplificado el descontento, afectando tu reputación.",
-                "C": "La demanda ha generado más atención negativa, empeorando la satisfacción de clientes.",
-                "D": "Menos interacción ha limitado tu capacidad de gestionar la crisis, afectando la confianza."
-            }
-        },
-        {
-            "description": f"Tu capital (${company.get('capital', 0):,}) está bajo presión por costos operativos altos.",
-            "options": {
-                "A": "Optimizar procesos para reducir costos sin afectar calidad.",
-                "B": "Mantener operaciones sin cambios.",
-                "C": "Despedir personal para ahorrar rápidamente.",
-                "D": "Aumentar precios para compensar costos."
-            },
-            "correct_option": "A",
-            "consequences": {
-                "A": "La optimización ha reducido costos, liberando capital para nuevas iniciativas.",
-                "B": "No actuar ha mantenido la presión financiera, limitando tus recursos.",
-                "C": "Los despidos han bajado la moral, afectando la satisfacción de empleados.",
-                "D": "Subir precios ha causado pérdida de clientes, impactando la cuota de mercado."
-            }
-        },
-        {
-            "description": f"La satisfacción de empleados ({company.get('satisfaction', 0)}%) está cayendo por falta de incentivos.",
-            "options": {
-                "A": "Implementar un programa de bonos y capacitación.",
-                "B": "Continuar sin cambios, enfocándote en clientes.",
-                "C": "Aumentar la carga de trabajo para mejorar resultados.",
-                "D": "Reducir beneficios para ahorrar costos."
-            },
-            "correct_option": "A",
-            "consequences": {
-                "A": "Los bonos y capacitación han motivado al equipo, aumentando la productividad.",
-                "B": "Ignorar a los empleados ha causado descontento, reduciendo su compromiso.",
-                "C": "Más carga de trabajo ha generado estrés, bajando la satisfacción de empleados.",
-                "D": "Reducir beneficios ha desmotivado al personal, afectando la moral."
-            }
-        }
-    ]
-    
-    # Adjust scenario likelihood based on company state
-    weights = [0.25] * len(scenarios)
-    if company.get("market_share", 20) < 15:
-        weights[0] *= 2
-    if company.get("customer_satisfaction", 70) < 50:
-        weights[1] *= 2
-    if company.get("capital", 500000) < 100000:
-        weights[2] *= 2
-    if company.get("satisfaction", 70) < 50:
-        weights[3] *= 2
-    
-    # Add difficulty note
-    difficulty_note = {
-        "Easy": "El impacto es moderado debido a la dificultad baja.",
-        "Medium": "El impacto es estándar.",
-        "Hard": "El impacto es significativo debido a la dificultad alta."
-    }
-    
-    challenge = random.choices(scenarios, weights=weights, k=1)[0]
-    for opt in challenge["consequences"]:
-        challenge["consequences"][opt] += f" {difficulty_note[difficulty]}"
-    return challenge
+    challenge = bank.sample(company, difficulty) if bank is not None else None
+    return challenge or game.create_fallback_challenge(company, difficulty)
 
-# Function to generate a challenge using Gemini API with retries
-def generate_challenge(company, max_retries=3):
-    prompt = f"""
-    Eres un simulador de negocios. Basándote en la siguiente empresa:
-    - Productos: {company.get('products', 'No disponible')}
-    - Inventario: {company.get('inventory', 'No disponible')}
-    - Capital: ${company.get('capital', 0)}
-    - Empleados: {company.get('employees', 0)}
-    - Satisfacción de Empleados: {company.get('satisfaction', 0)}%
-    - Satisfacción de Clientes: {company.get('customer_satisfaction', 0)}%
-    - Cuota de Mercado: {company.get('market_share', 0)}%
-    - Dificultad: {st.session_state.difficulty}
-    Genera un desafío realista en español que enfrente el CEO, con 4 opciones de respuesta (etiquetadas A, B, C, D). Incluye:
-    - Descripción del desafío
-    - 4 opciones de respuesta
-    - La opción correcta (letra)
-    - Consecuencias específicas para cada opción (sin mencionar cuál es la correcta o compararlas)
-    Devuelve la respuesta en formato JSON.
-    Ejemplo:
-    {{
-      "description": "Un cliente importante está insatisfecho...",
-      "options": {{
-        "A": "Ofrecer un descuento...",
-        "B": "Ignorar el problema...",
-        "C": "Aumentar precios...",
-        "D": "Cambiar el producto..."
-      }},
-      "correct_option": "A",
-      "consequences": {{
-        "A": "El descuento mejora la relación con el cliente.",
-        "B": "Ignorar el problema causa pérdida de confianza.",
-        "C": "Subir precios aleja al cliente.",
-        "D": "Cambiar el producto genera incertidumbre."
-      }}
-    }}
-    """
-    for attempt in range(max_retries):
+# Function to look up a cached challenge for a company state, other than the ones in exclude
+def cached_challenge(company, difficulty, exclude=()):
+    if challenge_store is None:
+        return None
+    return challenge_store.get(challenge_cache.state_fingerprint(company, difficulty), exclude)
+
+# Function to return the descriptions of the challenges this game has shown (the history's own strings)
+def seen_challenges():
+    if "seen_challenges" not in game_state:
+        seen = set(game_state.history.challenges)
+        if "current_challenge" in game_state:
+            seen.add(game_state.current_challenge["description"])
+        game_state.seen_challenges = seen
+    return game_state.seen_challenges
+
+# Function to make a challenge the current one, remembering it so the cache and the queue never serve it again
+def show_challenge(challenge):
+    game_state.current_challenge = models.compact_challenge(challenge)
+    seen_challenges().add(game_state.current_challenge["description"])
+
+# Function to count the LLM calls, estimated tokens and challenges of one challenge request
+def record_challenge_usage(mode, prompt, response, challenges):
+    metrics.inc("llm_challenge_calls_total", mode=mode)
+    metrics.inc("llm_challenge_tokens_total", llm.estimate_tokens(prompt) + llm.estimate_tokens(response), mode=mode)
+    metrics.inc("llm_challenges_generated_total", challenges, mode=mode)
+
+# Function to request a challenge from Gemini API, retrying malformed JSON (no UI calls, safe in worker threads).
+# With a deadline the calls are hedged and give up when it passes; a late response still fills the cache
+def request_challenge(company, difficulty, max_retries=3, deadline=None, exclude=()):
+    cached = cached_challenge(company, difficulty, exclude)
+    if cached:
+        return cached
+    prompt = prompts.challenge_prompt(company, difficulty)
+    cache_key = challenge_cache.state_fingerprint(company, difficulty)
+    expires = None if deadline is None else time.monotonic() + deadline
+
+    # Challenges are cached for every session, so one whose answer would have to be guessed is rejected
+    def store(response):
+        challenge = schema.parse_challenge(response, guess_correct=False)
+        record_challenge_usage("single", prompt, response, 1 if challenge else 0)
+        if challenge is not None and challenge_store is not None:
+            challenge_store.put(cache_key, challenge)
+        return challenge
+
+    with metrics.span("generate", kind="challenge"):
+        for attempt in range(max_retries):
+            metrics.inc("generate_attempts_total", kind="challenge")
+            try:
+                response = llm_client.generate(prompt, seconds_left(expires), hedge=expires is not None, on_late=store)
+            except llm.DeadlineExceeded:
+                metrics.inc("generate_deadline_exceeded_total", kind="challenge")
+                break
+            except llm.LLMError:
+                break
+            challenge = store(response)
+            if challenge is not None:
+                return challenge
+            metrics.inc("generate_parse_failures_total", kind="challenge")
+    return None
+
+# Function to request a batch of challenges aimed at the company's weakest metrics (no UI calls, safe in worker threads).
+# Past the deadline it returns None and a late batch is only cached
+def request_challenge_batch(company, difficulty, initial_company, deadline=None):
+    order = game.metrics_by_weakness(company, initial_company)
+    prompt = prompts.batch_challenge_prompt(company, difficulty, [order[i % len(order)] for i in range(batch_size)])
+
+    def store(response):
+        challenges = schema.parse_challenges(response, guess_correct=False)
+        record_challenge_usage("batch", prompt, response, len(challenges))
+        if challenge_store is not None:
+            cache_key = challenge_cache.state_fingerprint(company, difficulty)
+            for challenge in challenges:
+                challenge_store.put(cache_key, challenge)
+        return challenges
+
+    with metrics.span("generate", kind="challenge_batch"):
+        metrics.inc("generate_attempts_total", kind="challenge_batch")
+        try:
+            response = llm_client.generate(prompt, deadline, hedge=deadline is not None, on_late=store)
+        except llm.DeadlineExceeded:
+            metrics.inc("generate_deadline_exceeded_total", kind="challenge_batch")
+            return None
+        except llm.LLMError:
+            return None
+    challenges = store(response)
+    if not challenges:
+        metrics.inc("generate_parse_failures_total", kind="challenge_batch")
+        return None
+    return challenge_queue.ChallengeQueue(company, difficulty, challenges)
+
+# Function to take the next queued challenge, refilling the queue when it is empty or stale;
+# waits at most deadline seconds for a background refill or a new batch
+def next_queued_challenge(company, difficulty, deadline=None):
+    refill = game_state.get("challenge_queue_refill")
+    if refill is not None:
         try:
-            response = model.generate_content(prompt)
-            return json.loads(response.text.strip("```json\n").strip("```"))
-        except (json.JSONDecodeError, Exception) as e:
-            if attempt == max_retries - 1:
-                st.warning("No se pudo generar el desafío. Generando desafío dinámico.")
-                return create_fallback_challenge(company, st.session_state.difficulty)
-            time.sleep(2 ** attempt)
-    return create_fallback_challenge(company, st.session_state.difficulty)
-
-# Function to update company state based on decision with difficulty-based impacts
+            game_state.challenge_queue = refill.result(deadline)
+        except concurrent.futures.TimeoutError:
+            # Still generating: keep it for the next round and let this one fall back
+            metrics.inc("generate_deadline_exceeded_total", kind="challenge_batch")
+            return None
+        except Exception:
+            pass
+        del game_state.challenge_queue_refill
+    queue = game_state.get("challenge_queue")
+    if queue and queue.is_stale(company, difficulty, batch_drift):
+        metrics.inc("challenge_queue_invalidations_total")
+        queue = None
+    if not queue:
+        queue = request_challenge_batch(company, difficulty, game_state.initial_company, deadline)
+        game_state.challenge_queue = queue
+    # Batches are cached too, so a queued challenge may already have been served from the cache
+    while queue:
+        challenge = queue.pop()
+        if challenge["description"] not in seen_challenges():
+            return challenge
+    return None
+
+# Function to generate a challenge using Gemini API within the deadline, falling back to a dynamic challenge
+def generate_challenge(company, max_retries=3, deadline=None):
+    challenge = request_challenge(company, st.session_state.difficulty, max_retries, deadline, seen_challenges())
+    if challenge is None:
+        metrics.inc("generate_fallbacks_total", kind="challenge")
+        st.warning("No se pudo generar el desafío. Generando desafío dinámico.")
+        return create_fallback_challenge(company, st.session_state.difficulty)
+    return challenge
+
+# Function to stream a challenge from Gemini API into a draft that fills in as it arrives
+def stream_challenge(company, difficulty):
+    cache_key = challenge_cache.state_fingerprint(company, difficulty)
+    prompt = prompts.challenge_prompt(company, difficulty)
+
+    def store(draft):
+        challenge = draft.challenge()
+        record_challenge_usage("stream", prompt, json.dumps(challenge or {}, ensure_ascii=False), 1 if challenge else 0)
+        if challenge and challenge_store is not None:
+            challenge_store.put(cache_key, challenge)
+
+    metrics.inc("generate_attempts_total", kind="challenge_stream")
+    return streaming.ChallengeDraft(llm_client.stream(prompt), on_complete=store)
+
+# Function to wait for a streamed challenge up to the deadline; a correct option the stream did not deliver
+# is asked for again for the same description and options. None when the shown challenge cannot be scored
+def finish_streamed_challenge(draft):
+    draft.join(llm_deadline)
+    shown = draft.snapshot()
+    challenge = schema.validate_challenge(shown, kind="challenge_stream", guess_correct=False)
+    if challenge is None and isinstance(shown.get("description"), str) and draft.options_ready:
+        challenge = complete_challenge(shown)
+    if challenge is None:
+        metrics.inc("generate_fallbacks_total", kind="challenge_stream")
+    return challenge
+
+# Function to ask for the correct option and missing consequences of a partly streamed challenge, or None
+def complete_challenge(shown):
+    prompt = prompts.completion_prompt(game_state.company, st.session_state.difficulty, shown)
+    metrics.inc("generate_attempts_total", kind="challenge_completion")
+    try:
+        response = llm_client.generate(prompt, llm_deadline)
+    except llm.LLMError:
+        return None
+    value, _ = schema.extract_json(response)
+    record_challenge_usage("completion", prompt, response, 1 if isinstance(value, dict) else 0)
+    if not isinstance(value, dict):
+        return None
+    consequences = value.get("consequences") if isinstance(value.get("consequences"), dict) else {}
+    return schema.validate_challenge({
+        **shown,
+        "correct_option": value.get("correct_option"),
+        "consequences": {**consequences, **shown["consequences"]}
+    }, kind="challenge_completion", guess_correct=False)
+
+# Function to render a challenge, or the part streamed so far, into its placeholders
+def render_challenge(challenge, description_slot, option_slots):
+    description_slot.write(f"**Desafío**: {challenge.get('description', '...')}")
+    for opt, slot in option_slots.items():
+        if opt in challenge["options"]:
+            slot.write(f"{opt}. {challenge['options'][opt]}")
+
+# Function to update company state based on decision with difficulty-based impacts,
+# drawing from the round's seeded stream so the decision can be replayed
 def update_company_state(company, choice, challenge):
-    correct = challenge["correct_option"]
-    difficulty_multipliers = {
-        "Easy": {"capital": 0.5, "satisfaction": 0.5, "customer_satisfaction": 0.5, "market_share": 0.5},
-        "Medium": {"capital": 1.0, "satisfaction": 1.0, "customer_satisfaction": 1.0, "market_share": 1.0},
-        "Hard": {"capital": 1.5, "satisfaction": 1.5, "customer_satisfaction": 1.5, "market_share": 1.5}
-    }
-    multiplier = difficulty_multipliers[st.session_state.difficulty]
-    
-    impacts = {
-        "A": {"capital": 0, "employees": 0, "satisfaction": 0, "customer_satisfaction": 0, "market_share": 0},
-        "B": {"capital": 0, "employees": 0, "satisfaction": 0, "customer_satisfaction": 0, "market_share": 0},
-        "C": {"capital": 0, "employees": 0, "satisfaction": 0, "customer_satisfaction": 0, "market_share": 0},
-        "D": {"capital": 0, "employees": 0, "satisfaction": 0, "customer_satisfaction": 0, "market_share": 0},
-    }
-    if choice == correct:
-        impacts[choice] = {
-            "capital": int(company["capital"] * random.uniform(0.01, 0.05) * multiplier["capital"]),
-            "employees": random.randint(0, 1),
-            "satisfaction": random.randint(3, 8) * multiplier["satisfaction"],
-            "customer_satisfaction": random.randint(3, 8) * multiplier["customer_satisfaction"],
-            "market_share": random.uniform(0.5, 2.0) * multiplier["market_share"]
-        }
-    else:
-        impacts[choice] = {
-            "capital": -int(company["capital"] * random.uniform(0.01, 0.05) * multiplier["capital"]),
-            "employees": -random.randint(0, 1),
-            "satisfaction": -random.randint(5, 10) * multiplier["satisfaction"],
-            "customer_satisfaction": -random.randint(5, 10) * multiplier["customer_satisfaction"],
-            "market_share": -random.uniform(0.5, 2.0) * multiplier["market_share"]
-        }
-    
-    company["capital"] = max(1000, company.get("capital", 0) + impacts[choice]["capital"])
-    company["employees"] = max(1, company.get("employees", 0) + impacts[choice]["employees"])
-    company["satisfaction"] = max(0, min(100, company.get("satisfaction", 0) + impacts[choice]["satisfaction"]))
-    company["customer_satisfaction"] = max(0, min(100, company.get("customer_satisfaction", 0) + impacts[choice]["customer_satisfaction"]))
-    company["market_share"] = max(0, min(100, company.get("market_share", 0) + impacts[choice]["market_share"]))
-    
-    if (company["capital"] <= 10000 and company["satisfaction"] <= 20) or company["customer_satisfaction"] <= 10 or company["market_share"] <= 5:
+    rng = game.round_rng(st.session_state.game_seed, st.session_state.round + 1)
+    if game.apply_decision(company, choice, challenge["correct_option"], st.session_state.difficulty, rng):
         st.session_state.game_over = True
         return "bancarrota"
     return company
 
-# Function to evaluate final state
+# Message shown when the final evaluation cannot be generated
+evaluation_error = "No se pudo evaluar el estado final. Por favor, revisa los datos."
+
+# Process-wide cache of final evaluations shared across sessions (disable with shared_cache = false under [evaluation])
+share_evaluations = st.secrets.get("evaluation", {}).get("shared_cache", True)
+max_shared_evaluations = 1000
+
+@st.cache_resource
+def shared_evaluations():
+    return {}
+
+# Function to build the memoization key of a game's final evaluation
+def evaluation_key(initial_company, final_company, history_length):
+    payload = json.dumps([dict(initial_company), dict(final_company), history_length], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+# Function to evaluate final state, streaming the analysis as it is generated
 def evaluate_final_state(initial_company, final_company):
-    prompt = f"""
-    Compara el estado inicial y final de una empresa:
-    Inicial: Capital ${initial_company.get('capital', 0)}, {initial_company.get('employees', 0)} empleados, satisfacción {initial_company.get('satisfaction', 0)}%, satisfacción de clientes {initial_company.get('customer_satisfaction', 0)}%, cuota de mercado {initial_company.get('market_share', 0)}%
-    Final: Capital ${final_company.get('capital', 0)}, {final_company.get('employees', 0)} empleados, satisfacción {final_company.get('satisfaction', 0)}%, satisfacción de clientes {final_company.get('customer_satisfaction', 0)}%, cuota de mercado {final_company.get('market_share', 0)}%
-    Determina si la empresa mejoró, empeoró o quebró. Explica por qué en español.
-    """
-    try:
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception:
-        return "No se pudo evaluar el estado final. Por favor, revisa los datos."
+    prompt = prompts.evaluation_prompt(initial_company, final_company)
+    with metrics.span("generate", kind="evaluation"):
+        metrics.inc("generate_attempts_total", kind="evaluation")
+        try:
+            yield from llm_client.stream(prompt)
+        except llm.LLMError:
+            metrics.inc("generate_fallbacks_total", kind="evaluation")
+            yield evaluation_error
+
+# Function to get the session's trend series, rebuilding it from history when missing or stale
+def get_metric_series():
+    metric_series = game_state.get("metric_series")
+    if metric_series is None or len(metric_series) != len(game_state.history) + 1:
+        metric_series = series.MetricSeries.from_history(game_state.initial_company, game_state.history)
+        game_state.metric_series = metric_series
+    return metric_series
+
+# Function to render the trend charts from the cached, downsampled series frames, and the running aggregates
+def render_trend_charts():
+    metric_series = get_metric_series()
+    for frame in metric_series.chart_frames():
+        st.line_chart(frame, height=200)
+    aggregates = metric_series.aggregates()
+    st.table({
+        "Indicador": [series.chart_labels[metric] for metric in aggregates],
+        "Actual": [round(values["current"], 1) for values in aggregates.values()],
+        f"Media últimas {series.rolling_window} rondas": [round(values["rolling_mean"], 1) for values in aggregates.values()],
+        "Media": [round(values["mean"], 1) for values in aggregates.values()],
+        "Mínimo": [round(values["min"], 1) for values in aggregates.values()],
+        "Máximo": [round(values["max"], 1) for values in aggregates.values()]
+    })
+
+# Function to get the session's replay engine, rebuilding it when the game changed
+def get_replay_engine():
+    engine = game_state.get("replay")
+    if engine is None or engine.seed != st.session_state.game_seed or len(engine) != len(game_state.history):
+        engine = replay.ReplayEngine(game_state.initial_company, game_state.history, st.session_state.game_seed)
+        game_state.replay = engine
+    return engine
+
+# Fragment: alternative trajectories of the played game; its widgets rerun only this section
+@st.fragment
+def render_what_if():
+    st.subheader("¿Qué habría pasado si...?")
+    history = game_state.history
+    if not replay.ReplayEngine.is_replayable(history):
+        st.info("Esta partida no registró los datos necesarios para reproducir decisiones alternativas.")
+        return
+    engine = get_replay_engine()
+    rounds = len(engine)
+    round_number = int(st.number_input("Ronda", min_value=1, max_value=rounds, value=rounds, key="what_if_round"))
+    choice = st.radio("Opción alternativa", ["A", "B", "C", "D"], horizontal=True, key="what_if_choice")
+    metric = st.selectbox("Indicador", list(series.chart_labels), format_func=series.chart_labels.get, key="what_if_metric")
+    with metrics.span("replay"):
+        alternative = engine.what_if(round_number, choice)
+        actual_path = engine.trajectory(engine.actual)
+        alternative_path = engine.trajectory(alternative)
+        company, bankrupt_round = engine.state(alternative)
+    # Both lines keep the rounds either one needs to keep its shape
+    actual_values = [state[metric] for state in actual_path]
+    alternative_values = [state[metric] for state in alternative_path]
+    keep = sorted(set(series.lttb_indices(range(len(actual_values)), actual_values, series.chart_point_budget).tolist())
+                  | set(series.lttb_indices(range(len(alternative_values)), alternative_values, series.chart_point_budget).tolist()))
+    st.line_chart({"Real": [actual_values[i] for i in keep], "Alternativa": [alternative_values[i] for i in keep]}, height=200)
+    if bankrupt_round:
+        st.write(f"Con la opción {choice} en la ronda {round_number}, la empresa habría quebrado en la ronda {bankrupt_round}.")
+    else:
+        st.write(f"Con la opción {choice} en la ronda {round_number}, la empresa habría terminado con capital ${company['capital']:,}, satisfacción de empleados {company['satisfaction']}%, satisfacción de clientes {company['customer_satisfaction']}% y cuota de mercado {company['market_share']:.1f}%.")
+
+    # Every combination of decisions in the last rounds, sharing the replayed prefix
+    last_k = st.selectbox("Explorar todas las decisiones de las últimas rondas", range(1, min(5, rounds) + 1), key="what_if_last_k")
+    with metrics.span("replay_explore", rounds=last_k):
+        endings = engine.explore(last_k)
+    scored = sorted(((game.game_score(company, engine.initial, bankrupt_round), choices) for choices, company, bankrupt_round in endings), reverse=True)
+    actual_company, actual_bankrupt_round = engine.state(engine.actual)
+    actual_score = game.game_score(actual_company, engine.initial, actual_bankrupt_round)
+    rank = 1 + sum(score > actual_score for score, _ in scored)
+    bankruptcies = sum(1 for _, _, bankrupt_round in endings if bankrupt_round)
+    best_score, best_choices = scored[0]
+    st.write(f"- Combinaciones posibles: {len(endings)}; en {bankruptcies} la empresa quiebra.")
+    st.write(f"- Mejor secuencia: {'-'.join(best_choices)} (puntuación {best_score:.1f}).")
+    st.write(f"- Tu secuencia {'-'.join(engine.actual[-last_k:])} (puntuación {actual_score:.1f}) ocupa el puesto {rank} de {len(endings)}.")
 
-# Function to save game state
-def save_game_state():
+# Function to mark company/history as changed so the session is written through again
+def bump_state_version():
+    st.session_state.state_version += 1
+
+# Function to snapshot the game for saving; the returned callable encodes it, so the
+# download button only pays for serialization when it is clicked
+def save_game_state(binary=False):
+    if session_store is not None:
+        # Read back from the session's write at the end of this run, so the button pins no game in memory
+        session_id = st.session_state.session_id
+
+        def encode():
+            with metrics.span("save_encode", binary=binary):
+                return models.encode_saved(load_persisted(session_id), binary)
+        return encode
+
+    company = copy.copy(game_state.company)
+    history = game_state.history
+    rounds = len(history)
+    initial_company = game_state.initial_company
+    fields = {
+        "round": st.session_state.round,
+        "game_over": st.session_state.game_over,
+        "difficulty": st.session_state.difficulty,
+        "total_rounds": st.session_state.total_rounds,
+        "page": st.session_state.page,
+        "seed": st.session_state.game_seed
+    }
+
+    # Runs on the download request, outside this script run: it must not touch st.session_state
+    def encode():
+        with metrics.span("save_encode", binary=binary):
+            return models.encode_saved({**models.to_saved(company, history, initial_company, rounds), **fields}, binary)
+    return encode
+
+# Function to write the session through to the session store when it changed since the last write:
+# the header without history, plus only the rounds played since the last write
+def persist_session():
+    if session_store is None or not game_state.company:
+        return
+    challenge = game_state.get("current_challenge")
+    key = (st.session_state.state_version, st.session_state.round, st.session_state.game_over,
+           st.session_state.difficulty, st.session_state.page, st.session_state.decision_made, id(challenge))
+    if game_state.get("persisted_key") == key:
+        return
+    history = game_state.history
     state = {
-        "company": st.session_state.company,
+        "company": game_state.company.to_dict(),
+        "history": [],
+        "initial_company": game_state.initial_company.to_dict(),
         "round": st.session_state.round,
-        "history": st.session_state.history,
         "game_over": st.session_state.game_over,
-        "initial_company": st.session_state.initial_company,
         "difficulty": st.session_state.difficulty,
-        "page": st.session_state.page
+        "total_rounds": st.session_state.total_rounds,
+        "page": st.session_state.page,
+        "seed": st.session_state.game_seed,
+        "decision_made": st.session_state.decision_made,
+        "decision_result": game_state.decision_result,
+        "current_challenge": challenge
     }
-    buffer = io.BytesIO()
-    buffer.write(json.dumps(state, ensure_ascii=False).encode('utf-8'))
-    buffer.seek(0)
-    return buffer
+    payload = models.encode_saved(state, binary=True)
+    start = game_state.get("persisted_rounds", 0)
+    with metrics.span("session_write"):
+        records = [json.dumps(record, ensure_ascii=False).encode("utf-8") for record in history[start:]]
+        # The stored rounds no longer match (e.g. expired meanwhile): rewrite them all
+        if not session_store.save(st.session_state.session_id, payload, records, start):
+            records = [json.dumps(record, ensure_ascii=False).encode("utf-8") for record in history]
+            session_store.save(st.session_state.session_id, payload, records)
+    game_state.persisted_rounds = len(history)
+    game_state.persisted_key = key
 
-# Function to load game state
+# Function to load game state, applying each uploaded file's content only once
 def load_game_state(uploaded_file):
+    data = uploaded_file.getvalue()
+    upload_hash = hashlib.sha1(data).hexdigest()
+    if st.session_state.get("loaded_upload_hash") == upload_hash:
+        return
     try:
-        state = json.loads(uploaded_file.read().decode('utf-8'))
-        st.session_state.company = state["company"]
-        st.session_state.round = state["round"]
-        st.session_state.history = state["history"]
-        st.session_state.game_over = state["game_over"]
-        st.session_state.initial_company = state["initial_company"]
-        st.session_state.difficulty = state.get("difficulty", "Medium")
-        st.session_state.page = state.get("page", "Perfil inicial de la empresa")
-        st.session_state.decision_made = False
-        st.session_state.decision_result = None
-        if "current_challenge" in st.session_state:
-            del st.session_state.current_challenge
+        apply_saved_state(models.decode_saved(data))
+        bump_state_version()
+        st.session_state.loaded_upload_hash = upload_hash
         st.rerun()
     except Exception as e:
         st.error(f"Error al cargar el archivo: {e}")
 
-# Streamlit app
-st.title("Simulación de Negocios")
-
-# Sidebar for navigation
-st.sidebar.header("Navegación")
-page = st.sidebar.radio(
-    "Ir a",
-    ["Perfil inicial de la empresa", "Simulación", "Resultados"],
-    index=["Perfil inicial de la empresa", "Simulación", "Resultados"].index(st.session_state.page),
-    key="page_selector"
-)
-if page != st.session_state.page:
-    st.session_state.page = page
-    st.rerun()
-
-# Save/Load in sidebar
-st.sidebar.header("Guardar/Cargar")
-if st.session_state.company:
-    st.sidebar.download_button(
-        label="Guardar Juego",
-        data=save_game_state(),
-        file_name="business_simulation.json",
-        mime="application/json"
-    )
-uploaded_file = st.sidebar.file_uploader("Cargar Juego", type=["json"])
-if uploaded_file:
-    load_game_state(uploaded_file)
-
-if st.session_state.page == "Perfil inicial de la empresa":
+# Page: initial company profile
+def render_profile_page():
     st.header("Perfil Inicial de la Empresa")
-    st.write("Toma el rol de CEO de una empresa mediana. Genera el perfil de tu empresa y comienza a tomar decisiones estratégicas para mejorarla a lo largo de 20 rondas.")
     
     # Difficulty selection
     st.session_state.difficulty = st.selectbox(
@@ -371,38 +625,55 @@ if st.session_state.page == "Perfil inicial de la empresa":
         index=["Easy", "Medium", "Hard"].index(st.session_state.difficulty)
     )
     
-    if not st.session_state.company:
+    # Campaign length, fixed once the company exists
+    st.session_state.total_rounds = int(st.number_input(
+        "Número de rondas",
+        min_value=1,
+        max_value=game.max_rounds,
+        value=st.session_state.total_rounds,
+        step=10,
+        disabled=bool(game_state.company)
+    ))
+    st.write(f"Toma el rol de CEO de una empresa mediana. Genera el perfil de tu empresa y comienza a tomar decisiones estratégicas para mejorarla a lo largo de {st.session_state.total_rounds} rondas.")
+    
+    if not game_state.company:
         if st.button("Generar Perfil"):
             # Generate company profile
             company = generate_company_profile()
             if company:
-                company["satisfaction"] = 70
-                company["customer_satisfaction"] = 70
-                company["market_share"] = 20
-                st.session_state.company = company
-                st.session_state.initial_company = copy.deepcopy(company)
+                company.update(game.initial_metrics)
+                company = models.Company.from_dict(company)
+                game_state.company = company
+                game_state.initial_company = copy.deepcopy(company)
                 st.session_state.round = 0
-                st.session_state.history = []
+                game_state.history = models.History()
+                game_state.pop("persisted_rounds", None)
+                st.session_state.game_seed = random.getrandbits(63)
+                game_state.pop("metric_series", None)
+                game_state.pop("replay", None)
+                game_state.pop("challenge_queue", None)
                 st.session_state.game_over = False
                 st.session_state.decision_made = False
-                st.session_state.decision_result = None
+                game_state.decision_result = None
+                bump_state_version()
                 st.rerun()
     else:
         st.subheader("Perfil de la Empresa")
-        st.markdown(format_company_profile(st.session_state.company))
+        st.markdown(format_company_profile(game_state.company))
         if st.button("Iniciar Simulación"):
             st.session_state.page = "Simulación"
             st.rerun()
 
-elif st.session_state.page == "Simulación":
-    if not st.session_state.company:
+# Page: simulation rounds
+def render_simulation_page():
+    if not game_state.company:
         st.warning("Por favor, genera un perfil desde la página de Perfil inicial de la empresa.")
     else:
-        st.subheader(f"Ronda {st.session_state.round + 1}/20 (Dificultad: {st.session_state.difficulty})")
-        company = st.session_state.company
+        st.subheader(f"Ronda {st.session_state.round + 1}/{st.session_state.total_rounds} (Dificultad: {st.session_state.difficulty})")
+        company = game_state.company
         
         # Display progress bar
-        st.progress(st.session_state.round / 20.0)
+        st.progress(st.session_state.round / st.session_state.total_rounds)
         
         # Display current company state
         st.write(f"**Estado Actual**")
@@ -413,47 +684,105 @@ elif st.session_state.page == "Simulación":
         st.write(f"- Cuota de Mercado: {company.get('market_share', 0)}%")
         
         # Display charts
-        if st.session_state.history:
-            history_df = pd.DataFrame(st.session_state.history)
-            chart_data = pd.DataFrame({
-                "Ronda": [0] + list(history_df["round"]),
-                "Capital": [st.session_state.initial_company["capital"]] + list(history_df["capital"]),
-                "Satisfacción de Empleados": [st.session_state.initial_company["satisfaction"]] + list(history_df["satisfaction"]),
-                "Satisfacción de Clientes": [st.session_state.initial_company["customer_satisfaction"]] + list(history_df["customer_satisfaction"]),
-                "Cuota de Mercado": [st.session_state.initial_company["market_share"]] + list(history_df["market_share"])
-            })
-            st.subheader("Tendencias")
-            st.line_chart(chart_data.set_index("Ronda")[["Capital"]], height=200)
-            st.line_chart(chart_data.set_index("Ronda")[["Satisfacción de Empleados", "Satisfacción de Clientes"]], height=200)
-            st.line_chart(chart_data.set_index("Ronda")[["Cuota de Mercado"]], height=200)
+        if game_state.history:
+            with metrics.span("charts", page=st.session_state.page):
+                st.subheader("Tendencias")
+                render_trend_charts()
         
-        if st.session_state.round < 20 and not st.session_state.game_over:
-            # Generate challenge
-            if "current_challenge" not in st.session_state:
-                challenge = generate_challenge(company)
+        if st.session_state.round < st.session_state.total_rounds and not st.session_state.game_over:
+            # Every wait on Gemini below shares one deadline, so a round never takes longer to appear
+            expires = None if llm_deadline is None else time.monotonic() + llm_deadline
+            # Generate challenge, streaming it when it is neither prefetched nor cached
+            if "current_challenge" not in game_state and "challenge_draft" not in game_state:
+                challenge = None
+                if st.session_state.round > 0 and not batch_size:
+                    challenge = prefetch.take_prefetched(game_state, st.session_state.round, company, st.session_state.difficulty,
+                                                         seconds_left(expires))
+                if not challenge:
+                    challenge = cached_challenge(company, st.session_state.difficulty, seen_challenges())
+                if not challenge and batch_size:
+                    challenge = next_queued_challenge(company, st.session_state.difficulty, seconds_left(expires))
                 if challenge:
-                    st.session_state.current_challenge = challenge
+                    show_challenge(challenge)
+                elif seconds_left(expires) == 0:
+                    metrics.inc("generate_fallbacks_total", kind="challenge")
+                    show_challenge(create_fallback_challenge(company, st.session_state.difficulty))
                 else:
-                    st.stop()
+                    game_state.challenge_draft = stream_challenge(company, st.session_state.difficulty)
             
-            challenge = st.session_state.current_challenge
-            st.write(f"**Desafío**: {challenge['description']}")
+            description_slot = st.empty()
             st.write("**Opciones**:")
-            for opt in ["A", "B", "C", "D"]:
-                st.write(f"{opt}. {challenge['options'][opt]}")
+            option_slots = {opt: st.empty() for opt in ["A", "B", "C", "D"]}
+            
+            # Render the streamed challenge progressively until all four options have arrived
+            draft = game_state.get("challenge_draft")
+            if draft is not None:
+                version = None
+                while not (draft.options_ready or draft.done or seconds_left(expires) == 0):
+                    render_challenge(draft.snapshot(), description_slot, option_slots)
+                    version = draft.wait(version, seconds_left(expires))
+                if not draft.options_ready:
+                    # Past the deadline the stream keeps going in the background and still fills the cache
+                    del game_state.challenge_draft
+                    if draft.done:
+                        challenge = generate_challenge(company, deadline=seconds_left(expires))
+                    else:
+                        metrics.inc("generate_deadline_exceeded_total", kind="challenge_stream")
+                        metrics.inc("generate_fallbacks_total", kind="challenge_stream")
+                        challenge = create_fallback_challenge(company, st.session_state.difficulty)
+                    show_challenge(challenge)
+                elif draft.done:
+                    del game_state.challenge_draft
+                    challenge = finish_streamed_challenge(draft)
+                    if challenge is None:
+                        # The player has not decided yet, so a complete challenge replaces it before they do
+                        st.warning("El desafío no llegó completo. Generando desafío dinámico.")
+                        challenge = create_fallback_challenge(company, st.session_state.difficulty)
+                    show_challenge(challenge)
+            
+            challenge = game_state.current_challenge if "current_challenge" in game_state else draft.snapshot()
+            render_challenge(challenge, description_slot, option_slots)
+            
+            # Speculatively generate next round's challenge while the player decides
+            # (batch mode serves the next rounds from its queue instead)
+            if st.session_state.round + 1 < st.session_state.total_rounds and not batch_size:
+                prefetch.start_prefetch(
+                    game_state,
+                    st.session_state.round + 1,
+                    [game.project_company_state(company, True, st.session_state.difficulty),
+                     game.project_company_state(company, False, st.session_state.difficulty)],
+                    st.session_state.difficulty,
+                    functools.partial(request_challenge, exclude=frozenset(seen_challenges()))
+                )
             
             # User input
             choice = st.radio("Selecciona una opción", ["A", "B", "C", "D"], key=f"choice_{st.session_state.round}")
             
-            if st.button("Confirmar Decisión") and not st.session_state.decision_made:
+            confirmed = st.button("Confirmar Decisión") and not st.session_state.decision_made
+            # Consequences may still be streaming in the background
+            if confirmed and "challenge_draft" in game_state:
+                finished = finish_streamed_challenge(game_state.challenge_draft)
+                del game_state.challenge_draft
+                if finished is None:
+                    # Never scored against a challenge the player did not see: show a complete one to decide on again
+                    confirmed = False
+                    finished = create_fallback_challenge(company, st.session_state.difficulty)
+                    st.warning("El desafío no llegó completo, así que tu decisión no se ha evaluado. Revisa este desafío y confirma de nuevo.")
+                show_challenge(finished)
+                challenge = game_state.current_challenge
+                render_challenge(challenge, description_slot, option_slots)
+            if confirmed:
                 # Update company state
                 result = update_company_state(company, choice, challenge)
                 
-                # Store history
-                st.session_state.history.append({
+                # Extend the trend series, then store history
+                get_metric_series().append(st.session_state.round + 1, company)
+                game_state.history.append({
                     "round": st.session_state.round + 1,
                     "challenge": challenge["description"],
                     "choice": choice,
+                    "correct_option": challenge["correct_option"],
+                    "difficulty": st.session_state.difficulty,
                     "consequence": challenge["consequences"][choice],
                     "capital": company["capital"],
                     "employees": company["employees"],
@@ -461,19 +790,26 @@ elif st.session_state.page == "Simulación":
                     "customer_satisfaction": company["customer_satisfaction"],
                     "market_share": company["market_share"]
                 })
+                bump_state_version()
                 
                 # Store decision result
-                st.session_state.decision_result = {
+                game_state.decision_result = {
                     "consequence": challenge["consequences"][choice],
                     "bancarrota": result == "bancarrota"
                 }
                 st.session_state.decision_made = True
+                
+                # Refill an empty queue for the post-decision company while the player reads the outcome
+                if batch_size and not st.session_state.game_over and st.session_state.round + 1 < st.session_state.total_rounds and not game_state.get("challenge_queue"):
+                    game_state.challenge_queue_refill = prefetch.submit(
+                        request_challenge_batch, copy.copy(company), st.session_state.difficulty, game_state.initial_company
+                    )
             
             # Display decision analysis immediately after confirmation
-            if st.session_state.decision_made and st.session_state.decision_result:
+            if st.session_state.decision_made and game_state.decision_result:
                 st.subheader("Análisis de tu Decisión")
-                st.markdown(f"**Consecuencias**: {st.session_state.decision_result['consequence']}")
-                if st.session_state.decision_result["bancarrota"]:
+                st.markdown(f"**Consecuencias**: {game_state.decision_result['consequence']}")
+                if game_state.decision_result["bancarrota"]:
                     st.error("¡La empresa ha quebrado! Las decisiones acumuladas han llevado a una situación insostenible.")
                 else:
                     st.write("**Estado Actualizado de la Empresa**")
@@ -488,21 +824,22 @@ elif st.session_state.page == "Simulación":
                 if st.button("Continuar"):
                     st.session_state.round += 1
                     st.session_state.decision_made = False
-                    st.session_state.decision_result = None
-                    if "current_challenge" in st.session_state:
-                        del st.session_state.current_challenge
+                    game_state.decision_result = None
+                    if "current_challenge" in game_state:
+                        del game_state.current_challenge
                     st.rerun()
             elif st.session_state.game_over:
                 st.info("La simulación ha terminado debido a la bancarrota. Ve a la página de Resultados o reinicia el juego.")
         else:
             st.info("La simulación ha terminado. Ve a la página de Resultados.")
 
-elif st.session_state.page == "Resultados":
-    if not st.session_state.company or st.session_state.round == 0:
+# Page: final results
+def render_results_page():
+    if not game_state.company or st.session_state.round == 0:
         st.warning("No hay resultados disponibles. Por favor, completa la simulación.")
     else:
         st.header("Resultados Finales")
-        company = st.session_state.company
+        company = game_state.company
         st.write(f"**Estado Final de la Empresa**")
         st.write(f"- Capital: ${company.get('capital', 0):,}")
         st.write(f"- Empleados: {company.get('employees', 0)}")
@@ -511,30 +848,100 @@ elif st.session_state.page == "Resultados":
         st.write(f"- Cuota de Mercado: {company.get('market_share', 0)}%")
         
         # Display charts
-        if st.session_state.history:
-            history_df = pd.DataFrame(st.session_state.history)
-            chart_data = pd.DataFrame({
-                "Ronda": [0] + list(history_df["round"]),
-                "Capital": [st.session_state.initial_company["capital"]] + list(history_df["capital"]),
-                "Satisfacción de Empleados": [st.session_state.initial_company["satisfaction"]] + list(history_df["satisfaction"]),
-                "Satisfacción de Clientes": [st.session_state.initial_company["customer_satisfaction"]] + list(history_df["customer_satisfaction"]),
-                "Cuota de Mercado": [st.session_state.initial_company["market_share"]] + list(history_df["market_share"])
-            })
-            st.subheader("Tendencias Finales")
-            st.line_chart(chart_data.set_index("Ronda")[["Capital"]], height=200)
-            st.line_chart(chart_data.set_index("Ronda")[["Satisfacción de Empleados", "Satisfacción de Clientes"]], height=200)
-            st.line_chart(chart_data.set_index("Ronda")[["Cuota de Mercado"]], height=200)
+        if game_state.history:
+            with metrics.span("charts", page=st.session_state.page):
+                st.subheader("Tendencias Finales")
+                render_trend_charts()
+            render_what_if()
         
-        # Evaluate final state
-        evaluation = evaluate_final_state(st.session_state.initial_company, company)
+        # Evaluate final state once per game; reruns reuse the stored analysis
         st.write("**Análisis Final**:")
-        st.markdown(evaluation)
+        key = evaluation_key(game_state.initial_company, company, len(game_state.history))
+        if game_state.get("evaluation_key") != key:
+            game_state.evaluation = shared_evaluations().get(key) if share_evaluations else None
+            game_state.evaluation_key = key
+        if game_state.evaluation is None:
+            evaluation = st.write_stream(evaluate_final_state(game_state.initial_company, company))
+            if not evaluation.endswith(evaluation_error):
+                game_state.evaluation = evaluation
+                if share_evaluations:
+                    cache = shared_evaluations()
+                    cache[key] = evaluation
+                    if len(cache) > max_shared_evaluations:
+                        cache.pop(next(iter(cache)))
+        else:
+            st.markdown(game_state.evaluation)
         
-        # Display decision history with expanders
+        # Display decision history with expanders, one page of rounds at a time
         st.subheader("Historial de Decisiones")
-        for record in st.session_state.history:
+        history = game_state.history
+        pages = -(-len(history) // history_page_size)
+        page = int(st.number_input("Página", min_value=1, max_value=max(1, pages), value=1, key="history_page")) if pages > 1 else 1
+        start = (page - 1) * history_page_size
+        if pages > 1:
+            st.caption(f"Rondas {start + 1}-{min(start + history_page_size, len(history))} de {len(history)}")
+        for record in history[start:start + history_page_size]:
             with st.expander(f"Ronda {record['round']}: {record['challenge'][:50]}..."):
                 st.write(f"**Desafío**: {record['challenge']}")
                 st.write(f"- Decisión: {record['choice']}")
                 st.write(f"- Consecuencias: {record['consequence']}")
                 st.write(f"- Estado: Capital ${record['capital']:,}, Empleados {record['employees']}, Satisfacción {record['satisfaction']}%, Clientes {record['customer_satisfaction']}%, Mercado {record['market_share']}%")
+
+# Rounds listed per page of the decision history
+history_page_size = 20
+
+# Streamlit app
+pages = {
+    "Perfil inicial de la empresa": render_profile_page,
+    "Simulación": render_simulation_page,
+    "Resultados": render_results_page
+}
+
+with metrics.rerun_span(st.session_state):
+    st.title("Simulación de Negocios")
+
+    # Sidebar for navigation
+    st.sidebar.header("Navegación")
+    page = st.sidebar.radio(
+        "Ir a",
+        ["Perfil inicial de la empresa", "Simulación", "Resultados"],
+        index=["Perfil inicial de la empresa", "Simulación", "Resultados"].index(st.session_state.page),
+        key="page_selector"
+    )
+    if page != st.session_state.page:
+        st.session_state.page = page
+        st.rerun()
+
+    # Save/Load in sidebar
+    st.sidebar.header("Guardar/Cargar")
+    if game_state.company:
+        save_format = st.sidebar.selectbox("Formato", ["JSON", "Binario comprimido"], key="save_format")
+        binary = save_format == "Binario comprimido"
+        st.sidebar.download_button(
+            label="Guardar Juego",
+            data=save_game_state(binary),
+            file_name="business_simulation.ceo" if binary else "business_simulation.json",
+            mime="application/octet-stream" if binary else "application/json"
+        )
+    uploaded_file = st.sidebar.file_uploader("Cargar Juego", type=["json", "ceo"])
+    if game_state.get("prefetch_hits") or game_state.get("prefetch_misses"):
+        st.sidebar.caption(f"Desafíos precargados: {game_state.get('prefetch_hits', 0)} aciertos, {game_state.get('prefetch_misses', 0)} fallos")
+    if uploaded_file:
+        load_game_state(uploaded_file)
+    else:
+        st.session_state.pop("loaded_upload_hash", None)
+    
+    # Opt-in per-session timings of the previous script run
+    if metrics.is_enabled() and metrics_settings.get("debug_panel") and st.session_state.get("metric_spans"):
+        with st.sidebar.expander("Depuración: tiempos de la última ejecución"):
+            for name, labels, seconds in st.session_state.metric_spans:
+                label_text = ", ".join(f"{key}={value}" for key, value in labels.items())
+                st.write(f"- {name} ({label_text}): {seconds * 1000:.1f} ms" if label_text else f"- {name}: {seconds * 1000:.1f} ms")
+    
+    with metrics.span("page", page=st.session_state.page):
+        pages[st.session_state.page]()
+
+    # Write the game through after every run that changed it
+    persist_session()
+    if session_store is not None:
+        session_store.touch(st.session_state.resident)
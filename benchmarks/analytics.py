@@ -0,0 +1,110 @@
+"""Ingest and report throughput of ``analytics.py`` over a synthetic archive.
+
+Writes ``--games`` save files (half JSON, half compressed binary) of games
+played with ``game.create_fallback_challenge`` challenges and a player who is
+right with probability ``--p-correct``. It then times:
+
+- a first ingest;
+- a second ingest after ``--new-games`` more files were added (only those
+  should be decoded);
+- the cohort report.
+
+The timings are printed as JSON.
+
+    python benchmarks/analytics.py --games 100000 --new-games 1000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import analytics  # noqa: E402
+import game  # noqa: E402
+import models  # noqa: E402
+
+profile = {
+    "products": "Software de gestión empresarial",
+    "inventory": "Licencias de software y servidores",
+    "capital": 500000,
+    "employees": 50,
+    "personnel": [{"name": "Ana López", "role": "Gerente Comercial"}],
+    **game.initial_metrics
+}
+
+# Function to write one played game as a save file, in the format save_game_state produces
+def write_game(directory, index, rounds, p_correct, rng):
+    difficulty = rng.choice(game.difficulties)
+    seed = rng.getrandbits(63)
+    company = dict(profile)
+    history = []
+    game_over = False
+    for round_number in range(1, rounds + 1):
+        challenge = game.create_fallback_challenge(company, difficulty, rng)
+        choice = challenge["correct_option"] if rng.random() < p_correct else rng.choice("ABCD")
+        game_over = game.apply_decision(company, choice, challenge["correct_option"], difficulty, game.round_rng(seed, round_number))
+        history.append({
+            "round": round_number, "challenge": challenge["description"], "choice": choice,
+            "correct_option": challenge["correct_option"], "difficulty": difficulty,
+            "consequence": challenge["consequences"][choice],
+            **{metric: company[metric] for metric in game.metrics}
+        })
+        if game_over:
+            break
+    binary = index % 2 == 1
+    saved = {
+        "company": company, "history": history, "initial_company": profile,
+        "round": len(history) - 1 if game_over else len(history), "game_over": game_over,
+        "difficulty": difficulty, "total_rounds": rounds, "page": "Resultados", "seed": seed
+    }
+    name = f"game-{index:07d}.{'ceo' if binary else 'json'}"
+    with open(os.path.join(directory, name), "wb") as f:
+        f.write(models.encode_saved(saved, binary))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark analytics ingest and report over synthetic saves")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--new-games", type=int, default=100, help="files added before the incremental ingest")
+    parser.add_argument("--rounds", type=int, default=game.default_rounds)
+    parser.add_argument("--p-correct", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        saves = os.path.join(tmp, "saves")
+        dataset = os.path.join(tmp, "dataset")
+        os.makedirs(saves)
+        for index in range(args.games):
+            write_game(saves, index, args.rounds, args.p_correct, rng)
+
+        started = time.perf_counter()
+        first = analytics.ingest(saves, dataset)
+        first_seconds = time.perf_counter() - started
+
+        for index in range(args.games, args.games + args.new_games):
+            write_game(saves, index, args.rounds, args.p_correct, rng)
+        started = time.perf_counter()
+        second = analytics.ingest(saves, dataset)
+        second_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        report = analytics.report(dataset)
+        report_seconds = time.perf_counter() - started
+
+    print(json.dumps({
+        "config": vars(args),
+        "ingest": {"counts": first, "seconds": first_seconds, "games_per_second": first["ingested"] / first_seconds},
+        "incremental_ingest": {"counts": second, "seconds": second_seconds},
+        "report": {"games": report["games"], "rounds": report["rounds"], "seconds": report_seconds},
+        "correct_rate_by_difficulty": report["correct_rate_by_difficulty"],
+        "by_difficulty": report["by_difficulty"]
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""End-to-end load test of app.py with a stubbed Gemini backend.
+
+Drives the real app through Streamlit's ``AppTest``, one AppTest per simulated
+player, with all sessions of a step interleaved in the same process (so the
+shared LLM client, caches and prefetch pool are exercised the way a single
+server process would exercise them). Each player generates a profile,
+plays up to --rounds rounds (a longer campaign when that exceeds the default),
+saves the game through the sidebar download button's own encoder, re-loads it
+and opens Resultados.
+
+Reports reruns per second, p50/p95/p99 rerun latency per page, LLM backend
+calls per game, estimated LLM tokens per played round and resident memory per
+session for every session count, as JSON on stdout (and in ``--out``) so
+results can be diffed between versions.
+
+    python benchmarks/loadtest.py --sessions 1,10,50 --latency 0.2 --failure-rate 0.05 --out loadtest.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from streamlit.delta_generator import DeltaGenerator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import game  # noqa: E402
+import llm  # noqa: E402
+
+APP = os.path.join(ROOT, "app.py")
+
+backend_calls = {"count": 0, "tokens": 0}
+_calls_lock = threading.Lock()
+_stub_generate = llm.StubBackend.generate
+
+async def _counting_generate(self, prompt):
+    response = await _stub_generate(self, prompt)
+    with _calls_lock:
+        backend_calls["count"] += 1
+        backend_calls["tokens"] += llm.estimate_tokens(prompt) + llm.estimate_tokens(response)
+    return response
+
+llm.StubBackend.generate = _counting_generate
+
+# AppTest drops the download button's data callable, so keep the one the last rerun rendered:
+# calling it produces exactly the file a player downloads
+_last_save = {}
+_download_button = DeltaGenerator.download_button
+
+def _capturing_download_button(self, label, data, *args, **kwargs):
+    _last_save["data"] = data
+    return _download_button(self, label, data, *args, **kwargs)
+
+DeltaGenerator.download_button = _capturing_download_button
+
+# AppTest drives a single global Runtime, so reruns from different sessions are
+# serialized; sessions still interleave and their background work (prefetch,
+# streaming, the shared LLM client) overlaps as it would on a server.
+_rerun_lock = threading.Lock()
+
+# Function to read this process's resident set size in bytes
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+class Session:
+    def __init__(self, args, cache_path, store_path):
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(APP, default_timeout=args.timeout)
+        self.at.secrets["gemini"] = {"api_key": "stub"}
+        self.at.secrets["llm"] = {
+            "backend": "stub",
+            "stub_latency": args.latency,
+            "stub_failure_rate": args.failure_rate,
+            "stub_chunk_delay": args.chunk_delay,
+            "stub_slow_rate": args.slow_rate,
+            "stub_slow_latency": args.slow_latency,
+            "base_delay": args.retry_delay,
+            "deadline": args.deadline,
+        }
+        self.at.secrets["challenge_cache"] = {"path": cache_path} if cache_path else {"enabled": False}
+        self.at.secrets["session_store"] = {"path": store_path, "max_resident": args.max_resident}
+        self.at.secrets["challenge_batch"] = {"size": args.batch_size}
+        self.rounds_played = 0
+        self.save_data = None
+        self.timings = []
+        self.errors = []
+
+    # Run one script rerun and record its latency under the given page label
+    def rerun(self, page, widget=None, timeout=None):
+        with _rerun_lock:
+            _last_save.clear()
+            started = time.perf_counter()
+            try:
+                (widget or self.at).run(timeout=timeout)
+            except Exception as e:
+                self.errors.append(f"{page}: {e}")
+                return False
+            self.timings.append((page, time.perf_counter() - started))
+            self.save_data = _last_save.get("data")
+        if self.at.exception:
+            self.errors.append(f"{page}: {self.at.exception[0].value}")
+            return False
+        return True
+
+    def button(self, label):
+        for button in self.at.button:
+            if button.label == label:
+                return button
+        return None
+
+    def navigate(self, page):
+        return self.rerun(page, self.at.sidebar.radio[0].set_value(page))
+
+    def play(self, rounds, think_time, binary=False, policy="random"):
+        if not self.rerun("Perfil inicial de la empresa"):
+            return
+        if rounds > game.default_rounds:
+            next(field for field in self.at.number_input if field.label == "Número de rondas").set_value(rounds)
+        if not self.rerun("Perfil inicial de la empresa", self.button("Generar Perfil").click()):
+            return
+        if not self.navigate("Simulación"):
+            return
+        for _ in range(rounds):
+            choice = next(radio for radio in self.at.radio if radio.label == "Selecciona una opción")
+            correct_option = None
+            if policy == "correct":
+                # A challenge still streaming may not have its answer yet
+                state = self.at.session_state["resident"].game
+                challenge = state["current_challenge"] if "current_challenge" in state else state["challenge_draft"].snapshot()
+                correct_option = challenge.get("correct_option")
+            choice.set_value(correct_option or random.choice(["A", "B", "C", "D"]))
+            time.sleep(think_time)
+            if not self.rerun("Simulación", self.button("Confirmar Decisión").click()):
+                return
+            self.rounds_played += 1
+            next_round = self.button("Continuar")
+            if next_round is None:
+                break
+            if not self.rerun("Simulación", next_round.click()):
+                return
+        # Save: the sidebar download button is rendered on every rerun once a company exists,
+        # and the file is encoded only when it is clicked
+        if binary and not self.rerun("Formato", self.at.sidebar.selectbox(key="save_format").set_value("Binario comprimido")):
+            return
+        if self.save_data is not None:
+            started = time.perf_counter()
+            payload = self.save_data()
+            self.timings.append(("Guardar", time.perf_counter() - started))
+            upload = ("business_simulation.ceo", payload, "application/octet-stream") if binary else ("business_simulation.json", payload, "application/json")
+            uploader = self.at.get("file_uploader")[0]
+            # A load that keeps rerunning (file left in the uploader) shows up as a timeout error here
+            if self.rerun("Cargar", uploader.set_value(upload), timeout=5):
+                self.rerun("Cargar", self.at.get("file_uploader")[0].set_value(None))
+            else:
+                self.at.get("file_uploader")[0].set_value(None)
+        if self.navigate("Resultados"):
+            self.rerun("Resultados")
+
+# Function to summarize latencies in milliseconds
+def percentiles(values):
+    values = np.array(values) * 1000
+    return {
+        "count": int(values.size),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99)),
+    }
+
+# Function to play one game per session concurrently and report throughput, latency and memory
+def run_step(args, sessions, cache_path, store_path):
+    calls_before, tokens_before = backend_calls["count"], backend_calls["tokens"]
+    rss_before = rss_bytes()
+    players = [Session(args, cache_path, store_path) for _ in range(sessions)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        list(executor.map(lambda player: player.play(args.rounds, args.think_time, args.binary_saves, args.policy), players))
+    wall = time.perf_counter() - started
+    rss_after = rss_bytes()
+
+    by_page = {}
+    for player in players:
+        for page, seconds in player.timings:
+            by_page.setdefault(page, []).append(seconds)
+    reruns = sum(len(player.timings) for player in players)
+    return {
+        "sessions": sessions,
+        "wall_seconds": wall,
+        "reruns": reruns,
+        "reruns_per_second": reruns / wall if wall else 0.0,
+        "latency_ms": {page: percentiles(values) for page, values in by_page.items()},
+        "llm_calls_per_game": (backend_calls["count"] - calls_before) / sessions,
+        "llm_tokens_per_round": (backend_calls["tokens"] - tokens_before) / max(1, sum(player.rounds_played for player in players)),
+        "rss_bytes_per_session": (rss_after - rss_before) / sessions,
+        "errors": [error for player in players for error in player.errors],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test app.py with a stubbed Gemini backend")
+    parser.add_argument("--sessions", default="1,5,10", help="comma-separated concurrent session counts")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub response latency in seconds")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="stub delay between streamed chunks")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="share of stub calls taking --slow-latency instead")
+    parser.add_argument("--slow-latency", type=float, default=5.0, help="stub latency of the slow tail in seconds")
+    parser.add_argument("--deadline", type=float, default=10.0, help="seconds a round may wait on the LLM (0 waits indefinitely)")
+    parser.add_argument("--retry-delay", type=float, default=0.1, help="base retry backoff of the LLM client")
+    parser.add_argument("--think-time", type=float, default=0.0, help="seconds a player spends reading each challenge")
+    parser.add_argument("--policy", choices=["random", "correct"], default="random",
+                        help="how players choose (correct avoids bankruptcy, for long campaigns)")
+    parser.add_argument("--binary-saves", action="store_true", help="save and re-load games in the compressed binary format")
+    parser.add_argument("--batch-size", type=int, default=0, help="challenges per LLM call (0 streams one per round)")
+    parser.add_argument("--no-cache", action="store_true", help="disable the challenge cache")
+    parser.add_argument("--max-resident", type=int, default=200, help="sessions kept in memory by the session store")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-rerun timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="also write the JSON report to this file")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Untimed warm-up game so imports and process-wide resources are not charged to the first step
+        Session(args, None, os.path.join(tmp, "sessions-warmup.sqlite3")).play(args.rounds, 0.0)
+        results = [
+            run_step(args, int(count), None if args.no_cache else os.path.join(tmp, f"cache-{count}.sqlite3"),
+                     os.path.join(tmp, f"sessions-{count}.sqlite3"))
+            for count in args.sessions.split(",")
+        ]
+    report = {"config": vars(args), "results": results}
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Bytes per session of the legacy dict state versus the compact ``models`` state.
+
+Builds ``--sessions`` finished games of ``--rounds`` rounds each, once with the
+original shapes (company dicts, a list of history dicts, the full challenge
+dict) and once with ``models.Company``/``models.History``/``compact_challenge``,
+and reports the memory traced by ``tracemalloc`` per session as JSON. Challenge
+text is drawn from a pool of ``--distinct-challenges`` challenges and decoded
+from JSON per session, as it would arrive from the LLM, cache or bank.
+
+    python benchmarks/session_memory.py --sessions 1000 --rounds 20 --distinct-challenges 200
+"""
+import argparse
+import copy
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import game  # noqa: E402
+import models  # noqa: E402
+
+profile = {
+    "products": "Software de gestión empresarial",
+    "inventory": "Licencias de software y servidores",
+    "capital": 500000,
+    "employees": 50,
+    "personnel": [
+        {"name": "Ana López", "role": "Gerente Comercial"},
+        {"name": "Carlos Pérez", "role": "Gerente Financiero"},
+        {"name": "Lucía Gómez", "role": "Gerente de Recursos Humanos"},
+        {"name": "Jorge Ruiz", "role": "Gerente de Marketing"}
+    ],
+    **game.initial_metrics
+}
+
+# Function to build the pool of serialized challenges sessions draw from
+def challenge_pool(size, seed):
+    rng = random.Random(seed)
+    pool = []
+    for i in range(size):
+        challenge = game.create_fallback_challenge(profile, rng.choice(game.difficulties), rng)
+        challenge["description"] += f" (escenario {i})"
+        pool.append(json.dumps(challenge, ensure_ascii=False))
+    return pool
+
+# Function to play one game, building state with the legacy or compact representation
+def build_session(pool, rounds, rng, compact):
+    company = json.loads(json.dumps(profile, ensure_ascii=False))
+    history = []
+    if compact:
+        company = models.Company.from_dict(company)
+        history = models.History()
+    initial_company = copy.deepcopy(company)
+    challenge = None
+    for round_number in range(rounds):
+        challenge = json.loads(rng.choice(pool))
+        if compact:
+            challenge = models.compact_challenge(challenge)
+        choice = rng.choice("ABCD")
+        game.apply_decision(company, choice, challenge["correct_option"], "Medium", rng)
+        history.append({
+            "round": round_number + 1,
+            "challenge": challenge["description"],
+            "choice": choice,
+            "consequence": challenge["consequences"][choice],
+            "capital": company["capital"],
+            "employees": company["employees"],
+            "satisfaction": company["satisfaction"],
+            "customer_satisfaction": company["customer_satisfaction"],
+            "market_share": company["market_share"]
+        })
+    return {"company": company, "initial_company": initial_company, "history": history, "current_challenge": challenge}
+
+# Function to measure traced bytes per session for one representation
+def bytes_per_session(pool, sessions, rounds, seed, compact):
+    rng = random.Random(seed)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build_session(pool, rounds, rng, compact) for _ in range(sessions)]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / sessions
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-session memory of legacy and compact state")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--distinct-challenges", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    pool = challenge_pool(args.distinct_challenges, args.seed)
+    legacy = bytes_per_session(pool, args.sessions, args.rounds, args.seed, compact=False)
+    compact = bytes_per_session(pool, args.sessions, args.rounds, args.seed, compact=True)
+    print(json.dumps({
+        "config": vars(args),
+        "legacy_bytes_per_session": legacy,
+        "compact_bytes_per_session": compact,
+        "reduction": 1 - compact / legacy
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Cold-start benchmark of app.py: import time and time to first render.
+
+Every measurement runs in a fresh interpreter so nothing is already imported.
+Reports the median import time of Streamlit, of each module app.py imports and
+of the Gemini SDK, then the time from interpreter start to the first completed
+script run (through Streamlit's ``AppTest``), the second run, and which heavy
+optional libraries the first render loaded. Renders are measured with the stub
+LLM backend and with the Gemini backend, which imports and configures the SDK;
+the Gemini render has its sockets disabled, so nothing reaches the network.
+
+    python benchmarks/startup.py --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+
+modules = ["streamlit", "game", "prompts", "prefetch", "challenge_cache", "challenge_queue", "llm", "streaming", "metrics",
+           "series", "replay", "models", "schema", "sessions", "google.generativeai"]
+backends = ["stub", "gemini"]
+heavy_modules = ["pandas", "numpy", "pyarrow", "google.generativeai"]
+
+import_script = """
+import sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+import {module}
+print(time.perf_counter() - started)
+"""
+
+render_script = """
+import json, socket, sys, tempfile, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+
+def offline(*args, **kwargs):
+    raise OSError("network disabled by the startup benchmark")
+
+socket.socket.connect = socket.socket.connect_ex = socket.create_connection = offline
+from streamlit.testing.v1 import AppTest
+tmp = tempfile.mkdtemp()
+at = AppTest.from_file({app!r}, default_timeout=60)
+at.secrets["gemini"] = {{"api_key": "stub"}}
+at.secrets["llm"] = {{"backend": {backend!r}}}
+at.secrets["challenge_cache"] = {{"path": tmp + "/cache.sqlite3"}}
+at.secrets["session_store"] = {{"path": tmp + "/sessions.sqlite3"}}
+at.run()
+first = time.perf_counter() - started
+at.run()
+second = time.perf_counter() - started - first
+print(json.dumps({{"first_render": first, "second_render": second, "exception": bool(at.exception),
+                  "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+# Function to run a snippet in a fresh interpreter and return its last output line
+def run_fresh(source):
+    result = subprocess.run([sys.executable, "-c", source], capture_output=True, text=True, cwd=ROOT, check=True)
+    return result.stdout.strip().splitlines()[-1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app.py import time and time to first render")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    import_seconds = {
+        module: statistics.median(float(run_fresh(import_script.format(root=ROOT, module=module))) for _ in range(args.repeat))
+        for module in modules
+    }
+    renders = {
+        backend: [json.loads(run_fresh(render_script.format(root=ROOT, app=APP, backend=backend, heavy=heavy_modules)))
+                  for _ in range(args.repeat)]
+        for backend in backends
+    }
+    print(json.dumps({
+        "config": vars(args),
+        "import_ms": {module: seconds * 1000 for module, seconds in import_seconds.items()},
+        **{
+            backend: {
+                "first_render_ms": statistics.median(render["first_render"] for render in runs) * 1000,
+                "second_render_ms": statistics.median(render["second_render"] for render in runs) * 1000,
+                "heavy_modules_loaded": runs[-1]["loaded"],
+                "exceptions": sum(render["exception"] for render in runs)
+            }
+            for backend, runs in renders.items()
+        }
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Offline-built, memory-mapped challenge bank.
+
+A bank directory holds three files:
+
+- ``challenges.bin``: UTF-8 JSON challenges, back to back;
+- ``index.npy``: byte offset and length of every challenge, grouped by
+  difficulty and then by the metric the challenge targets;
+- ``groups.npy``: ``[start, stop)`` index range of each (difficulty, metric).
+
+At runtime both files are memory-mapped, a metric is picked with the same
+weakness weighting as ``game.create_fallback_challenge`` and a challenge is
+read from its group in O(1), without network access.
+
+    python challenge_bank.py --out bank --per-group 2500 --api-key $GEMINI_API_KEY
+"""
+import argparse
+import json
+import mmap
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+import game
+import llm
+import schema
+
+index_dtype = np.dtype([("offset", "<u8"), ("length", "<u4")])
+
+metric_descriptions = {
+    "market_share": "la cuota de mercado",
+    "customer_satisfaction": "la satisfacción de clientes",
+    "capital": "el capital y los costos",
+    "satisfaction": "la satisfacción de empleados"
+}
+
+class ChallengeBank:
+    def __init__(self, path):
+        self.path = path
+        self.index = np.load(os.path.join(path, "index.npy"), mmap_mode="r")
+        self.groups = np.load(os.path.join(path, "groups.npy")).tolist()
+        with open(os.path.join(path, "challenges.bin"), "rb") as f:
+            # An empty file cannot be mapped; a bank without challenges only ever samples None
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+
+    def __len__(self):
+        return len(self.index)
+
+    # Pick a challenge for the company's weakest metrics, like the dynamic fallback does
+    def sample(self, company, difficulty, rng=random):
+        d = game.difficulties.index(difficulty)
+        weights = [
+            weight if self.groups[d][m][1] > self.groups[d][m][0] else 0
+            for m, weight in enumerate(game.fallback_weights(company))
+        ]
+        if not any(weights):
+            return None
+        m = rng.choices(range(len(weights)), weights=weights, k=1)[0]
+        start, stop = self.groups[d][m]
+        offset, length = self.index[rng.randrange(start, stop)].tolist()
+        return json.loads(self._data[offset:offset + length].decode("utf-8"))
+
+# Function to build the prompt for one bank challenge
+def bank_prompt(metric, difficulty, variant):
+    return f"""
+    Eres un simulador de negocios. Genera un desafío realista en español que enfrente el CEO de una empresa mediana,
+    centrado en {metric_descriptions[metric]}. Dificultad: {difficulty}. Variante número {variant}: evita repetir escenarios típicos.
+    Incluye una descripción, 4 opciones (A, B, C, D), la opción correcta (letra) y consecuencias específicas para cada opción
+    (sin mencionar cuál es la correcta). Devuelve solo el JSON con las claves "description", "options", "correct_option" y "consequences".
+    """
+
+# Function to write a bank directory from {(difficulty, metric): [challenge, ...]}
+def write_bank(path, challenges_by_group):
+    os.makedirs(path, exist_ok=True)
+    groups = np.zeros((len(game.difficulties), len(game.fallback_targets), 2), dtype=np.int64)
+    entries = []
+    offset = 0
+    with open(os.path.join(path, "challenges.bin.tmp"), "wb") as data:
+        for d, difficulty in enumerate(game.difficulties):
+            for m, metric in enumerate(game.fallback_targets):
+                groups[d, m, 0] = len(entries)
+                for challenge in challenges_by_group.get((difficulty, metric), []):
+                    encoded = json.dumps(challenge, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                    data.write(encoded)
+                    entries.append((offset, len(encoded)))
+                    offset += len(encoded)
+                groups[d, m, 1] = len(entries)
+    np.save(os.path.join(path, "index.tmp.npy"), np.array(entries, dtype=index_dtype))
+    np.save(os.path.join(path, "groups.tmp.npy"), groups)
+    os.replace(os.path.join(path, "challenges.bin.tmp"), os.path.join(path, "challenges.bin"))
+    os.replace(os.path.join(path, "index.tmp.npy"), os.path.join(path, "index.npy"))
+    os.replace(os.path.join(path, "groups.tmp.npy"), os.path.join(path, "groups.npy"))
+
+# Function to generate per_group validated challenges for every (difficulty, metric) with the LLM client;
+# raises RuntimeError, leaving any existing bank in place, when none of them is usable
+def build_bank(path, client, per_group, workers=16):
+    def generate(difficulty, metric, variant):
+        try:
+            response = client.generate(bank_prompt(metric, difficulty, variant))
+        except llm.LLMError:
+            return difficulty, metric, None
+        # A guessed correct option would be baked into the bank for good
+        return difficulty, metric, schema.parse_challenge(response, kind="bank", guess_correct=False)
+
+    challenges_by_group = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(generate, difficulty, metric, variant)
+            for difficulty in game.difficulties
+            for metric in game.fallback_targets
+            for variant in range(per_group)
+        ]
+        for future in as_completed(futures):
+            difficulty, metric, challenge = future.result()
+            if challenge:
+                challenges_by_group.setdefault((difficulty, metric), []).append(challenge)
+    count = sum(len(challenges) for challenges in challenges_by_group.values())
+    if count == 0:
+        raise RuntimeError(f"none of the {len(futures)} generated challenges was usable")
+    write_bank(path, challenges_by_group)
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate a challenge bank")
+    parser.add_argument("--out", required=True, help="bank directory")
+    parser.add_argument("--per-group", type=int, default=2500, help="challenges per difficulty and target metric")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"))
+    parser.add_argument("--stub", action="store_true", help="use the offline stub backend")
+    parser.add_argument("--rate", type=float, default=5.0, help="requests per second")
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+    if args.stub:
+        backend = llm.StubBackend(latency=0.0)
+    elif args.api_key:
+        backend = llm.GeminiBackend(args.api_key)
+    else:
+        parser.error("--api-key (or GEMINI_API_KEY) is required unless --stub is given")
+    client = llm.LLMClient(backend, rate_per_second=args.rate, burst=max(1, int(args.rate)), max_concurrency=args.workers)
+    try:
+        count = build_bank(args.out, client, args.per_group, args.workers)
+    except RuntimeError as e:
+        parser.exit(1, f"No bank written: {e}\n")
+    print(f"Wrote {count} challenges to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from prefetch import company_bucket
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ceo", "challenges.sqlite3")
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+# Quantized fingerprint of every company field the challenge prompt uses
+def state_fingerprint(company, difficulty):
+    bucket = company_bucket(company, difficulty) + (
+        company.get("inventory", ""),
+        int(math.log(max(1, company.get("employees", 0)), 1.5)),
+    )
+    return hashlib.sha1(json.dumps(bucket, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+# Minimal shape check before a challenge is stored for other sessions
+def is_valid_challenge(challenge):
+    try:
+        return (
+            isinstance(challenge["description"], str)
+            and all(isinstance(challenge["options"][opt], str) for opt in "ABCD")
+            and all(isinstance(challenge["consequences"][opt], str) for opt in "ABCD")
+            and challenge["correct_option"] in ("A", "B", "C", "D")
+        )
+    except (KeyError, TypeError):
+        return False
+
+class ChallengeCache:
+    """Disk-backed store of validated challenges, several per state fingerprint.
+
+    Entries expire after ``ttl_seconds`` and the least recently served ones are
+    evicted beyond ``max_entries``. ``reuse_ratio`` is the probability of serving
+    a cached challenge for a fully populated fingerprint instead of generating a
+    fresh one; fingerprints with fewer than ``variants_per_key`` entries are
+    reused proportionally less often so content stays varied. ``get`` skips the
+    challenges whose description is in ``exclude``, the ones the player has seen.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_entries=50000, ttl_seconds=7 * 24 * 3600,
+                 reuse_ratio=0.7, variants_per_key=8):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.reuse_ratio = reuse_ratio
+        self.variants_per_key = variants_per_key
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS challenges ("
+            "id INTEGER PRIMARY KEY, key TEXT NOT NULL, payload TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS challenges_key ON challenges (key)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS challenges_last_used ON challenges (last_used)")
+
+    # Return a cached challenge for this fingerprint whose description is not in exclude,
+    # or None when a fresh one should be generated
+    def get(self, key, exclude=()):
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload FROM challenges WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl_seconds),
+            ).fetchall()
+            candidates = [(row_id, json.loads(payload)) for row_id, payload in rows]
+            candidates = [(row_id, challenge) for row_id, challenge in candidates if challenge["description"] not in exclude]
+            if not candidates:
+                return None
+            fill = min(1.0, len(candidates) / self.variants_per_key)
+            if random.random() >= self.reuse_ratio * fill:
+                return None
+            row_id, challenge = random.choice(candidates)
+            self._conn.execute("UPDATE challenges SET last_used = ? WHERE id = ?", (now, row_id))
+        return challenge
+
+    # Store a freshly generated challenge and enforce TTL and size bounds
+    def put(self, key, challenge):
+        if not is_valid_challenge(challenge):
+            return
+        now = time.time()
+        payload = json.dumps(challenge, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT INTO challenges (key, payload, created_at, last_used) VALUES (?, ?, ?, ?)",
+                    (key, payload, now, now),
+                )
+                # Keep at most variants_per_key per fingerprint, dropping the least recently used
+                self._conn.execute(
+                    "DELETE FROM challenges WHERE id IN (SELECT id FROM challenges WHERE key = ? "
+                    "ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (key, self.variants_per_key),
+                )
+                self._conn.execute("DELETE FROM challenges WHERE created_at < ?", (now - self.ttl_seconds,))
+                self._conn.execute(
+                    "DELETE FROM challenges WHERE id IN (SELECT id FROM challenges "
+                    "ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM challenges").fetchone()[0]
+
+# One cache per path for the whole process, shared by all sessions and worker threads
+def get_cache(path=DEFAULT_PATH, **options):
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = ChallengeCache(path, **options)
+        return cache
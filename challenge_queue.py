@@ -0,0 +1,31 @@
+"""Per-session queue of challenges generated several at a time.
+
+One LLM call returns a batch of challenges spread over the company's weakest
+metrics, and rounds consume them in order. The queue remembers the metrics of
+the company it was generated for and goes stale once any of them drifts past a
+relative threshold, because its challenges would no longer describe the company.
+"""
+from collections import deque
+
+import game
+
+class ChallengeQueue:
+    __slots__ = ("anchor", "difficulty", "challenges")
+
+    def __init__(self, company, difficulty, challenges):
+        self.anchor = {metric: company[metric] for metric in game.fallback_targets}
+        self.difficulty = difficulty
+        self.challenges = deque(challenges)
+
+    def __len__(self):
+        return len(self.challenges)
+
+    def pop(self):
+        return self.challenges.popleft()
+
+    # Largest relative change of a target metric since the batch was generated
+    def drift(self, company):
+        return max(abs(company[metric] - value) / max(1, abs(value)) for metric, value in self.anchor.items())
+
+    def is_stale(self, company, difficulty, max_drift):
+        return difficulty != self.difficulty or self.drift(company) > max_drift
@@ -0,0 +1,215 @@
+import random
+
+# Game rules shared by the Streamlit app and the headless engines (no Streamlit imports here)
+
+difficulties = ["Easy", "Medium", "Hard"]
+
+# Difficulty-based impact multipliers
+difficulty_multipliers = {
+    "Easy": {"capital": 0.5, "satisfaction": 0.5, "customer_satisfaction": 0.5, "market_share": 0.5},
+    "Medium": {"capital": 1.0, "satisfaction": 1.0, "customer_satisfaction": 1.0, "market_share": 1.0},
+    "Hard": {"capital": 1.5, "satisfaction": 1.5, "customer_satisfaction": 1.5, "market_share": 1.5}
+}
+
+# Rounds of a game unless the player picks a longer campaign, and the longest campaign offered
+default_rounds = 20
+max_rounds = 1000
+
+# Metrics tracked every round, in history/record order
+metrics = ["capital", "employees", "satisfaction", "customer_satisfaction", "market_share"]
+
+# Starting values the app assigns to every generated profile
+initial_metrics = {"satisfaction": 70, "customer_satisfaction": 70, "market_share": 20}
+
+# Profile used when one cannot be generated
+default_profile = {
+    "products": "Productos genéricos",
+    "inventory": "Inventario estándar",
+    "capital": 500000,
+    "employees": 50,
+    "personnel": [
+        {"name": "Juan García", "role": "Gerente General"},
+        {"name": "María Rodríguez", "role": "Gerente Comercial"},
+        {"name": "Luis Fernández", "role": "Gerente Financiero"}
+    ]
+}
+
+# Function to check the bankruptcy rule
+def is_bankrupt(company):
+    return (company["capital"] <= 10000 and company["satisfaction"] <= 20) or company["customer_satisfaction"] <= 10 or company["market_share"] <= 5
+
+# Function to get the random stream of one round of a seeded game; replaying a
+# round with the same seed, state and choice reproduces it exactly
+def round_rng(seed, round_number):
+    return random.Random(f"{seed}:{round_number}")
+
+# Function to apply a decision to the company in place; returns True on bankruptcy.
+# rng needs uniform() and randint(); the random module is used by default.
+def apply_decision(company, choice, correct_option, difficulty, rng=random):
+    multiplier = difficulty_multipliers[difficulty]
+    if choice == correct_option:
+        impact = {
+            "capital": int(company["capital"] * rng.uniform(0.01, 0.05) * multiplier["capital"]),
+            "employees": rng.randint(0, 1),
+            "satisfaction": rng.randint(3, 8) * multiplier["satisfaction"],
+            "customer_satisfaction": rng.randint(3, 8) * multiplier["customer_satisfaction"],
+            "market_share": rng.uniform(0.5, 2.0) * multiplier["market_share"]
+        }
+    else:
+        impact = {
+            "capital": -int(company["capital"] * rng.uniform(0.01, 0.05) * multiplier["capital"]),
+            "employees": -rng.randint(0, 1),
+            "satisfaction": -rng.randint(5, 10) * multiplier["satisfaction"],
+            "customer_satisfaction": -rng.randint(5, 10) * multiplier["customer_satisfaction"],
+            "market_share": -rng.uniform(0.5, 2.0) * multiplier["market_share"]
+        }
+
+    company["capital"] = max(1000, company.get("capital", 0) + impact["capital"])
+    company["employees"] = max(1, company.get("employees", 0) + impact["employees"])
+    company["satisfaction"] = max(0, min(100, company.get("satisfaction", 0) + impact["satisfaction"]))
+    company["customer_satisfaction"] = max(0, min(100, company.get("customer_satisfaction", 0) + impact["customer_satisfaction"]))
+    company["market_share"] = max(0, min(100, company.get("market_share", 0) + impact["market_share"]))
+    return is_bankrupt(company)
+
+# Function to score a finished game: 0 on bankruptcy, else 100 x the mean ratio of final to initial metrics
+def game_score(company, initial, bankrupt_round):
+    if bankrupt_round:
+        return 0.0
+    return 100 * sum(company[metric] / max(1, initial[metric]) for metric in fallback_targets) / len(fallback_targets)
+
+# Function to project the expected company state after a correct or wrong decision
+def project_company_state(company, correct, difficulty):
+    multiplier = difficulty_multipliers[difficulty]
+    sign = 1 if correct else -1
+    swing = 5.5 if correct else 7.5
+    projected = dict(company)
+    projected["capital"] = max(1000, company.get("capital", 0) + sign * int(company.get("capital", 0) * 0.03 * multiplier["capital"]))
+    projected["satisfaction"] = max(0, min(100, company.get("satisfaction", 0) + sign * swing * multiplier["satisfaction"]))
+    projected["customer_satisfaction"] = max(0, min(100, company.get("customer_satisfaction", 0) + sign * swing * multiplier["customer_satisfaction"]))
+    projected["market_share"] = max(0, min(100, company.get("market_share", 0) + sign * 1.25 * multiplier["market_share"]))
+    return projected
+
+# Fallback scenarios, one per metric in fallback_targets order; descriptions are format templates
+fallback_scenarios = [
+    {
+        "description": "Un competidor lanza un producto similar a menor precio, amenazando tu cuota de mercado.",
+        "options": {
+            "A": "Invertir en marketing para destacar la calidad del producto.",
+            "B": "Mantener precios y observar el mercado.",
+            "C": "Reducir la calidad para bajar costos y competir en precio.",
+            "D": "Aumentar precios para posicionarte como premium."
+        },
+        "correct_option": "A",
+        "consequences": {
+            "A": "Tu inversión en marketing ha reforzado la percepción de calidad, atrayendo más clientes.",
+            "B": "Al no actuar, algunos clientes han migrado a la competencia, afectando tus ventas.",
+            "C": "Reducir la calidad ha generado quejas, dañando la satisfacción de clientes.",
+            "D": "El aumento de precios ha alejado a clientes sensibles al costo, reduciendo tu cuota de mercado."
+        }
+    },
+    {
+        "description": "Una queja viral en redes sociales afecta la satisfacción de clientes.",
+        "options": {
+            "A": "Responder públicamente y ofrecer una solución inmediata.",
+            "B": "Ignorar el problema, esperando que pase desapercibido.",
+            "C": "Demandar a los responsables por difamación.",
+            "D": "Reducir la interacción en redes sociales."
+        },
+        "correct_option": "A",
+        "consequences": {
+            "A": "Tu respuesta rápida ha restaurado la confianza, mejorando la percepción de los clientes.",
+            "B": "Ignorar la queja ha amplificado el descontento, afectando tu reputación.",
+            "C": "La demanda ha generado más atención negativa, empeorando la satisfacción de clientes.",
+            "D": "Menos interacción ha limitado tu capacidad de gestionar la crisis, afectando la confianza."
+        }
+    },
+    {
+        "description": "Tu capital (${capital:,}) está bajo presión por costos operativos altos.",
+        "options": {
+            "A": "Optimizar procesos para reducir costos sin afectar calidad.",
+            "B": "Mantener operaciones sin cambios.",
+            "C": "Despedir personal para ahorrar rápidamente.",
+            "D": "Aumentar precios para compensar costos."
+        },
+        "correct_option": "A",
+        "consequences": {
+            "A": "La optimización ha reducido costos, liberando capital para nuevas iniciativas.",
+            "B": "No actuar ha mantenido la presión financiera, limitando tus recursos.",
+            "C": "Los despidos han bajado la moral, afectando la satisfacción de empleados.",
+            "D": "Subir precios ha causado pérdida de clientes, impactando la cuota de mercado."
+        }
+    },
+    {
+        "description": "La satisfacción de empleados ({satisfaction}%) está cayendo por falta de incentivos.",
+        "options": {
+            "A": "Implementar un programa de bonos y capacitación.",
+            "B": "Continuar sin cambios, enfocándote en clientes.",
+            "C": "Aumentar la carga de trabajo para mejorar resultados.",
+            "D": "Reducir beneficios para ahorrar costos."
+        },
+        "correct_option": "A",
+        "consequences": {
+            "A": "Los bonos y capacitación han motivado al equipo, aumentando la productividad.",
+            "B": "Ignorar a los empleados ha causado descontento, reduciendo su compromiso.",
+            "C": "Más carga de trabajo ha generado estrés, bajando la satisfacción de empleados.",
+            "D": "Reducir beneficios ha desmotivado al personal, afectando la moral."
+        }
+    }
+]
+
+# Metric each fallback scenario (and challenge bank group) targets
+fallback_targets = ["market_share", "customer_satisfaction", "capital", "satisfaction"]
+
+# Difficulty note appended to fallback consequences
+difficulty_notes = {
+    "Easy": "El impacto es moderado debido a la dificultad baja.",
+    "Medium": "El impacto es estándar.",
+    "Hard": "El impacto es significativo debido a la dificultad alta."
+}
+
+# Function to order fallback_targets from the furthest below its starting value to the least
+def metrics_by_weakness(company, initial):
+    return sorted(fallback_targets, key=lambda metric: company[metric] / max(1, initial[metric]))
+
+# Function to weight fallback_targets by company weakness
+def fallback_weights(company):
+    weights = [0.25] * len(fallback_targets)
+    if company.get("market_share", 20) < 15:
+        weights[0] *= 2
+    if company.get("customer_satisfaction", 70) < 50:
+        weights[1] *= 2
+    if company.get("capital", 500000) < 100000:
+        weights[2] *= 2
+    if company.get("satisfaction", 70) < 50:
+        weights[3] *= 2
+    return weights
+
+# Function to generate a dynamic fallback challenge, formatting only the chosen scenario
+def create_fallback_challenge(company, difficulty, rng=random):
+    scenario = rng.choices(fallback_scenarios, weights=fallback_weights(company), k=1)[0]
+    note = difficulty_notes[difficulty]
+    return {
+        "description": scenario["description"].format(capital=company.get("capital", 0), satisfaction=company.get("satisfaction", 0)),
+        "options": dict(scenario["options"]),
+        "correct_option": scenario["correct_option"],
+        "consequences": {opt: f"{text} {note}" for opt, text in scenario["consequences"].items()}
+    }
+
+class UniformStream:
+    """Random source replaying a fixed sequence of uniforms in [0, 1).
+
+    Maps each draw exactly as the vectorized engine does, so a scalar game fed
+    the same uniforms reproduces the batched result bit for bit.
+    """
+
+    def __init__(self, uniforms):
+        self._uniforms = iter(uniforms)
+
+    def random(self):
+        return float(next(self._uniforms))
+
+    def uniform(self, a, b):
+        return a + (b - a) * self.random()
+
+    def randint(self, a, b):
+        return a + int(self.random() * (b - a + 1))
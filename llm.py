@@ -0,0 +1,270 @@
+"""Shared non-blocking LLM client.
+
+All sessions of a process submit prompts to one asyncio event loop running in a
+background thread. The loop applies a global token-bucket rate limit, a bounded
+concurrency semaphore, jittered exponential retries (``asyncio.sleep``, so a
+backoff never holds another session) and single-flight deduplication of
+identical in-flight prompts. A call can be hedged: once it has been pending
+longer than the observed p95 latency, a second backend request races it and
+the first answer wins. A blocking call can also be given a deadline, after
+which it raises ``DeadlineExceeded`` while the request keeps running and hands
+its late response to a callback. Backends are pluggable; ``StubBackend``
+serves canned responses offline.
+"""
+import asyncio
+import concurrent.futures
+import json
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+
+class LLMError(Exception):
+    """Raised when a prompt still fails after all retries."""
+
+class DeadlineExceeded(LLMError):
+    """Raised when a blocking call has no response by its deadline."""
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = None
+
+    async def acquire(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class GeminiBackend:
+    def __init__(self, api_key, model_name="gemini-1.5-flash"):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    async def generate(self, prompt):
+        response = await self.model.generate_content_async(prompt)
+        return response.text
+
+    async def stream(self, prompt):
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            yield chunk.text
+
+class StubBackend:
+    """Offline backend with configurable latency, per-chunk delay and failure rate.
+
+    A ``slow_rate`` share of calls takes ``slow_latency`` seconds instead, to
+    model a provider's latency tail.
+
+    ``responder(prompt)`` returns the response text; by default it answers with
+    a minimal company profile, challenge or evaluation depending on the prompt.
+    """
+
+    def __init__(self, latency=0.05, failure_rate=0.0, responder=None, chunk_size=24, chunk_delay=0.0,
+                 slow_rate=0.0, slow_latency=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.responder = responder or default_stub_response
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+
+    async def generate(self, prompt):
+        await asyncio.sleep(self.slow_latency if random.random() < self.slow_rate else self.latency)
+        if random.random() < self.failure_rate:
+            raise RuntimeError("stub backend failure")
+        return self.responder(prompt)
+
+    async def stream(self, prompt):
+        text = await self.generate(prompt)
+        for start in range(0, len(text), self.chunk_size):
+            await asyncio.sleep(self.chunk_delay)
+            yield text[start:start + self.chunk_size]
+
+# Function to build canned responses for the app's three prompt kinds
+def default_stub_response(prompt):
+    if "perfil" in prompt:
+        return json.dumps({
+            "products": "Software de gestión empresarial",
+            "inventory": "Licencias de software y servidores",
+            "capital": 500000,
+            "employees": 50,
+            "personnel": [
+                {"name": "Ana López", "role": "Gerente Comercial"},
+                {"name": "Carlos Pérez", "role": "Gerente Financiero"}
+            ]
+        }, ensure_ascii=False)
+    if "Compara" in prompt:
+        return "La empresa se mantuvo estable durante la simulación."
+    batch = re.search(r"Genera (\d+) desafíos", prompt)
+    challenges = [{
+        "description": f"Desafío de prueba {random.randint(1, 10 ** 6)}.",
+        "options": {opt: f"Opción {opt}." for opt in "ABCD"},
+        "correct_option": random.choice("ABCD"),
+        "consequences": {opt: f"Consecuencia de la opción {opt}." for opt in "ABCD"}
+    } for _ in range(int(batch.group(1)) if batch else 1)]
+    return "```json\n" + json.dumps(challenges if batch else challenges[0], ensure_ascii=False) + "\n```"
+
+# Function to estimate the tokens of a prompt or response (about four characters per token)
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+class LLMClient:
+    def __init__(self, backend, rate_per_second=5.0, burst=10, max_concurrency=16,
+                 max_retries=3, base_delay=1.0, hedge_quantile=0.95, hedge_min_samples=20, latency_window=200):
+        self.backend = backend
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.stats = {"requests": 0, "backend_calls": 0, "coalesced": 0, "retries": 0, "failures": 0,
+                      "hedged": 0, "hedge_wins": 0, "deadline_exceeded": 0, "late_responses": 0}
+        self._latencies = deque(maxlen=latency_window)
+        self._bucket = TokenBucket(rate_per_second, burst)
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        self._in_flight = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-client", daemon=True)
+        self._thread.start()
+
+    async def _call(self, operation):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            await self._bucket.acquire()
+            self.stats["backend_calls"] += 1
+            return await operation()
+
+    async def _with_retries(self, operation):
+        for attempt in range(self.max_retries):
+            try:
+                return await self._call(operation)
+            except Exception as e:
+                if attempt == self.max_retries - 1:
+                    self.stats["failures"] += 1
+                    raise LLMError(str(e)) from e
+                self.stats["retries"] += 1
+                await asyncio.sleep(self.base_delay * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    async def _timed_generate(self, prompt):
+        started = time.monotonic()
+        text = await self.backend.generate(prompt)
+        self._latencies.append(time.monotonic() - started)
+        return text
+
+    # Seconds after which a pending call is hedged: the observed hedge_quantile latency, None until enough samples
+    def hedge_delay(self):
+        if self.hedge_quantile is None or len(self._latencies) < self.hedge_min_samples:
+            return None
+        latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(self.hedge_quantile * len(latencies)))]
+
+    # Coroutine racing a second request against the first once it outlives hedge_delay()
+    async def _hedged(self, prompt):
+        first = asyncio.ensure_future(self._with_retries(lambda: self._timed_generate(prompt)))
+        delay = self.hedge_delay()
+        if delay is None:
+            return await first
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        self.stats["hedged"] += 1
+        second = asyncio.ensure_future(self._with_retries(lambda: self._timed_generate(prompt)))
+        pending = {first, second}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    self.stats["hedge_wins"] += task is second
+                    return task.result()
+        raise second.exception()
+
+    # Coroutine returning the response text; identical in-flight prompts share one request
+    async def agenerate(self, prompt, hedge=False):
+        self.stats["requests"] += 1
+        task = self._in_flight.get(prompt)
+        if task is None:
+            if hedge:
+                task = asyncio.ensure_future(self._hedged(prompt))
+            else:
+                task = asyncio.ensure_future(self._with_retries(lambda: self._timed_generate(prompt)))
+            self._in_flight[prompt] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(prompt, None))
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    # Blocking call for script and worker threads; waits only on this prompt, for at most timeout seconds.
+    # Past the deadline it raises DeadlineExceeded and a late response is passed to on_late in a worker thread
+    def generate(self, prompt, timeout=None, hedge=False, on_late=None):
+        future = asyncio.run_coroutine_threadsafe(self.agenerate(prompt, hedge), self._loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            self.stats["deadline_exceeded"] += 1
+            future.add_done_callback(lambda late: self._deliver_late(late, on_late))
+            raise DeadlineExceeded(f"no response within {timeout:.1f}s") from None
+
+    def _deliver_late(self, future, on_late):
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.stats["late_responses"] += 1
+        if on_late is not None:
+            # Keep callbacks (cache writes) off the event loop thread
+            self._loop.run_in_executor(None, on_late, future.result())
+
+    # Blocking generator yielding text chunks as they arrive; retries only before the first chunk
+    def stream(self, prompt):
+        chunks = queue.Queue()
+        done = object()
+
+        async def produce():
+            self.stats["requests"] += 1
+            started = False
+
+            async def consume():
+                nonlocal started
+                async for chunk in self.backend.stream(prompt):
+                    started = True
+                    chunks.put(chunk)
+
+            try:
+                for attempt in range(self.max_retries):
+                    try:
+                        await self._call(consume)
+                        break
+                    except Exception as e:
+                        if started or attempt == self.max_retries - 1:
+                            self.stats["failures"] += 1
+                            chunks.put(LLMError(str(e)))
+                            break
+                        self.stats["retries"] += 1
+                        await asyncio.sleep(self.base_delay * 2 ** attempt * random.uniform(0.5, 1.5))
+            finally:
+                chunks.put(done)
+
+        asyncio.run_coroutine_threadsafe(produce(), self._loop)
+        while True:
+            chunk = chunks.get()
+            if chunk is done:
+                return
+            if isinstance(chunk, LLMError):
+                raise chunk
+            yield chunk
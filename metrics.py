@@ -0,0 +1,170 @@
+"""Process-wide timing spans, counters and histograms.
+
+Disabled by default: ``span`` then returns a shared no-op context manager and
+``inc``/``observe`` return immediately, so instrumented code pays one flag
+check. When enabled, spans feed ``<name>_seconds`` histograms, optionally a
+JSONL event log, and the per-session list of the rerun in progress (shown by
+the app's sidebar debug panel). ``prometheus_text`` renders everything in the
+Prometheus text exposition format and ``serve_prometheus`` exposes it over HTTP.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_enabled = False
+buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_collectors = []
+_local = threading.local()
+_jsonl = None
+_server = None
+
+def is_enabled():
+    return _enabled
+
+# Function to turn instrumentation on or off and choose the JSONL log
+def configure(enabled=False, jsonl_path=None, **_):
+    global _enabled, _jsonl
+    _enabled = bool(enabled)
+    with _lock:
+        if jsonl_path and (_jsonl is None or _jsonl.name != jsonl_path):
+            _jsonl = open(jsonl_path, "a", buffering=1, encoding="utf-8")
+        elif not jsonl_path and _jsonl is not None:
+            _jsonl.close()
+            _jsonl = None
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def inc(name, value=1, **labels):
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def observe(name, value, **labels):
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [[0] * len(buckets), 0, 0.0]
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                histogram[0][i] += 1
+        histogram[1] += 1
+        histogram[2] += value
+
+# Register fn() -> {name: value} whose values are exported as gauges
+def register_collector(fn):
+    if fn not in _collectors:
+        _collectors.append(fn)
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_null_span = _NullSpan()
+
+class _Span:
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        observe(f"{self.name}_seconds", elapsed, **self.labels)
+        spans = getattr(_local, "spans", None)
+        if spans is not None:
+            spans.append((self.name, self.labels, elapsed))
+        if _jsonl is not None:
+            event = {"ts": time.time(), "span": self.name, "seconds": elapsed, **self.labels}
+            with _lock:
+                if _jsonl is not None:
+                    _jsonl.write(json.dumps(event, ensure_ascii=False) + "\n")
+        return False
+
+# Time a block; labels become Prometheus labels
+def span(name, **labels):
+    if not _enabled:
+        return _null_span
+    return _Span(name, labels)
+
+class _RerunSpan(_Span):
+    def __init__(self, state, labels):
+        super().__init__("rerun", labels)
+        self.state = state
+
+    def __enter__(self):
+        _local.spans = []
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        super().__exit__(exc_type, exc, tb)
+        self.state["metric_spans"] = _local.spans
+        _local.spans = None
+        return False
+
+# Time a whole script run and keep its spans in the session state for the debug panel
+def rerun_span(state, **labels):
+    if not _enabled:
+        return _null_span
+    return _RerunSpan(state, labels)
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"'.replace("\n", " ") for k, v in labels) + "}"
+
+# Render all metrics in the Prometheus text exposition format
+def prometheus_text():
+    lines = []
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: ([*value[0]], value[1], value[2]) for key, value in _histograms.items()}
+    for (name, labels), value in sorted(counters.items()):
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    for (name, labels), (counts, count, total) in sorted(histograms.items()):
+        for bound, bucket_count in zip(buckets, counts):
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {bucket_count}")
+        lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+    for collector in _collectors:
+        for name, value in collector().items():
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+class _PrometheusHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+# Serve /metrics for Prometheus scraping from a daemon thread (once per process)
+def serve_prometheus(port, host="0.0.0.0"):
+    global _server
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _PrometheusHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server
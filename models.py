@@ -0,0 +1,194 @@
+"""Compact per-session game state.
+
+``Company`` replaces the free-form company dict with a ``__slots__`` object that
+still supports the mapping access the game code uses (``company["capital"]``,
+``company.get(...)``, ``dict(company)``). ``History`` stores the decision
+history column-wise in typed arrays, with challenge and consequence text
+interned so identical text (cached, banked or fallback challenges) is held once
+per process. ``to_saved``/``from_saved`` keep the existing save-file JSON shape,
+and ``encode_saved``/``decode_saved`` write it either as plain JSON or as the
+compressed binary format (magic, schema version, zlib-compressed JSON).
+"""
+import json
+import struct
+import sys
+import zlib
+from array import array
+from collections.abc import Mapping
+
+from game import difficulties
+
+class Company(Mapping):
+    __slots__ = ("products", "inventory", "capital", "employees", "satisfaction",
+                 "customer_satisfaction", "market_share", "personnel")
+
+    def __init__(self, products="", inventory="", capital=0, employees=0, satisfaction=0,
+                 customer_satisfaction=0, market_share=0, personnel=()):
+        self.products = sys.intern(str(products))
+        self.inventory = sys.intern(str(inventory))
+        self.capital = capital
+        self.employees = employees
+        self.satisfaction = satisfaction
+        self.customer_satisfaction = customer_satisfaction
+        self.market_share = market_share
+        self.personnel = tuple(
+            {"name": sys.intern(str(person.get("name", ""))), "role": sys.intern(str(person.get("role", "")))}
+            for person in personnel or ()
+            if isinstance(person, dict)
+        )
+
+    # Build from a profile or saved dict, ignoring fields the game does not use
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data[field] for field in cls.__slots__ if field in data})
+
+    def to_dict(self):
+        company = {field: getattr(self, field) for field in self.__slots__}
+        company["personnel"] = [dict(person) for person in self.personnel]
+        return company
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __eq__(self, other):
+        if isinstance(other, Mapping):
+            return dict(self) == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __copy__(self):
+        return Company.from_dict(self)
+
+    def __deepcopy__(self, memo):
+        return Company.from_dict(self.to_dict())
+
+class History:
+    """Decision history with one typed column per record field.
+
+    Appending takes the same record dicts the app always built, and iterating
+    or indexing yields them back, so callers keep working with ``record["..."]``.
+    """
+
+    __slots__ = ("rounds", "choices", "correct_options", "difficulties", "challenges", "consequences",
+                 "capital", "employees", "satisfaction", "customer_satisfaction", "market_share")
+
+    def __init__(self):
+        self.rounds = array("l")
+        self.choices = bytearray()
+        self.correct_options = bytearray()
+        self.difficulties = bytearray()
+        self.challenges = []
+        self.consequences = []
+        self.capital = array("q")
+        self.employees = array("l")
+        self.satisfaction = array("d")
+        self.customer_satisfaction = array("d")
+        self.market_share = array("d")
+
+    @classmethod
+    def from_records(cls, records):
+        history = cls()
+        for record in records:
+            history.append(record)
+        return history
+
+    def append(self, record):
+        self.rounds.append(int(record["round"]))
+        self.choices.append(ord(record["choice"]))
+        # Records from saves made before replay support lack these; 0 marks them unknown
+        self.correct_options.append(ord(record["correct_option"]) if record.get("correct_option") else 0)
+        self.difficulties.append(difficulties.index(record["difficulty"]) + 1 if record.get("difficulty") in difficulties else 0)
+        self.challenges.append(sys.intern(record["challenge"]))
+        self.consequences.append(sys.intern(record["consequence"]))
+        self.capital.append(int(record["capital"]))
+        self.employees.append(int(record["employees"]))
+        self.satisfaction.append(record["satisfaction"])
+        self.customer_satisfaction.append(record["customer_satisfaction"])
+        self.market_share.append(record["market_share"])
+
+    def __len__(self):
+        return len(self.rounds)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return {
+            "round": self.rounds[index],
+            "challenge": self.challenges[index],
+            "choice": chr(self.choices[index]),
+            "correct_option": chr(self.correct_options[index]) if self.correct_options[index] else None,
+            "difficulty": difficulties[self.difficulties[index] - 1] if self.difficulties[index] else None,
+            "consequence": self.consequences[index],
+            "capital": self.capital[index],
+            "employees": self.employees[index],
+            "satisfaction": self.satisfaction[index],
+            "customer_satisfaction": self.customer_satisfaction[index],
+            "market_share": self.market_share[index]
+        }
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_records(self):
+        return list(self)
+
+# Function to intern a challenge's text before it is kept in session state
+def compact_challenge(challenge):
+    return {
+        "description": sys.intern(challenge["description"]),
+        "options": {opt: sys.intern(text) for opt, text in challenge["options"].items()},
+        "correct_option": challenge["correct_option"],
+        "consequences": {opt: sys.intern(text) for opt, text in challenge["consequences"].items()}
+    }
+
+# Function to convert session objects to the save-file JSON shape, optionally only the first rounds of history
+def to_saved(company, history, initial_company, rounds=None):
+    return {
+        "company": company.to_dict() if company is not None else None,
+        "history": history.to_records() if rounds is None else history[:rounds],
+        "initial_company": initial_company.to_dict() if initial_company is not None else None
+    }
+
+# Function to convert save-file JSON fields back to session objects
+def from_saved(saved):
+    return {
+        "company": Company.from_dict(saved["company"]) if saved.get("company") else None,
+        "history": History.from_records(saved.get("history", [])),
+        "initial_company": Company.from_dict(saved["initial_company"]) if saved.get("initial_company") else None
+    }
+
+# Binary save files: magic, schema version (u2), then zlib-compressed JSON
+save_magic = b"CEOSAVE"
+save_schema_version = 1
+_save_header = struct.Struct(f"<{len(save_magic)}sH")
+
+# Function to encode a saved-state dict as JSON or compressed binary bytes
+def encode_saved(saved, binary=False):
+    data = json.dumps(saved, ensure_ascii=False, separators=(",", ":") if binary else None).encode("utf-8")
+    if not binary:
+        return data
+    return _save_header.pack(save_magic, save_schema_version) + zlib.compress(data, 9)
+
+# Function to decode save-file bytes in either format back to a saved-state dict
+def decode_saved(data):
+    if data.startswith(save_magic):
+        _, version = _save_header.unpack_from(data)
+        if version > save_schema_version:
+            raise ValueError(f"versión de archivo no soportada: {version}")
+        data = zlib.decompress(data[_save_header.size:])
+    return json.loads(data.decode("utf-8"))
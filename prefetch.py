@@ -0,0 +1,77 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+# Shared worker pool; lives for the whole process because Streamlit only
+# re-executes app.py on each rerun, not the modules it imports.
+_max_workers = 4
+_executor = ThreadPoolExecutor(max_workers=_max_workers, thread_name_prefix="challenge-prefetch")
+
+# Function to size the worker pool to the LLM client's concurrency, so a worker never sits
+# blocked on a call the client has not started yet; work already queued still runs
+def configure(max_workers):
+    global _executor, _max_workers
+    if max_workers != _max_workers:
+        previous = _executor
+        _max_workers = max_workers
+        _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="challenge-prefetch")
+        previous.shutdown(wait=False)
+
+# Bucket a company state so that nearby states share a speculative challenge
+def company_bucket(company, difficulty):
+    capital = max(1, company.get("capital", 0))
+    return (
+        difficulty,
+        company.get("products", ""),
+        int(math.log(capital, 1.25)),
+        int(company.get("satisfaction", 0) // 10),
+        int(company.get("customer_satisfaction", 0) // 10),
+        int(company.get("market_share", 0) // 5),
+    )
+
+# Run fn(*args) in the shared worker pool, for background work not tied to a round
+def submit(fn, *args):
+    return _executor.submit(fn, *args)
+
+# Start generating one challenge per likely post-decision state
+def start_prefetch(state, round_number, branches, difficulty, generate):
+    pending = state.get("prefetch")
+    if pending and pending["round"] == round_number:
+        return
+    discard_prefetch(state)
+    state["prefetch"] = {
+        "round": round_number,
+        "branches": [
+            (company_bucket(company, difficulty), _executor.submit(generate, company, difficulty))
+            for company in branches
+        ],
+    }
+
+# Take the speculative challenge matching the actual state, waiting at most timeout seconds for it;
+# one still queued behind other sessions' work is a miss rather than a wait. Counts hits and misses
+def take_prefetched(state, round_number, company, difficulty, timeout=None):
+    pending = state.pop("prefetch", None)
+    challenge = None
+    if pending and pending["round"] == round_number:
+        bucket = company_bucket(company, difficulty)
+        for branch_bucket, future in pending["branches"]:
+            if branch_bucket == bucket and (future.running() or future.done()):
+                try:
+                    challenge = future.result(timeout)
+                except Exception:
+                    challenge = None
+                break
+        for _, future in pending["branches"]:
+            future.cancel()
+    key = "prefetch_hits" if challenge else "prefetch_misses"
+    state[key] = state.get(key, 0) + 1
+    metrics.inc("prefetch_total", result="hit" if challenge else "miss")
+    return challenge
+
+# Drop any in-flight speculation (new game, loaded game, reset)
+def discard_prefetch(state):
+    pending = state.pop("prefetch", None)
+    if pending:
+        for _, future in pending["branches"]:
+            future.cancel()
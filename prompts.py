@@ -0,0 +1,104 @@
+"""LLM prompts of the game, importable without Streamlit or the Gemini SDK."""
+
+# Prompt asking for a new company profile as JSON
+profile_prompt = """
+    Genera un perfil detallado en español de una empresa mediana estable. Incluye exactamente los siguientes campos en formato JSON:
+    - "products": Descripción de productos o servicios ofrecidos (texto).
+    - "inventory": Descripción general del inventario (texto).
+    - "capital": Capital inicial en USD (número entero).
+    - "employees": Número de empleados (número entero).
+    - "personnel": Lista de objetos con "name" (nombre completo) y "role" (rol en la empresa). Incluye al menos: gerente comercial, gerente financiero, gerente de recursos humanos, gerente de relaciones públicas, gerente de marketing, gerente de operaciones, y otros puestos relevantes.
+    Ejemplo:
+    {
+      "products": "Software de gestión empresarial",
+      "inventory": "Licencias de software y servidores",
+      "capital": 500000,
+      "employees": 50,
+      "personnel": [
+        {"name": "Ana López", "role": "Gerente Comercial"},
+        {"name": "Carlos Pérez", "role": "Gerente Financiero"},
+        ...
+      ]
+    }
+    Devuelve solo el JSON, sin texto adicional.
+    """
+
+# Function to build the challenge prompt for a company state
+def challenge_prompt(company, difficulty):
+    return f"""
+    Eres un simulador de negocios. Basándote en la siguiente empresa:
+    - Productos: {company.get('products', 'No disponible')}
+    - Inventario: {company.get('inventory', 'No disponible')}
+    - Capital: ${company.get('capital', 0)}
+    - Empleados: {company.get('employees', 0)}
+    - Satisfacción de Empleados: {company.get('satisfaction', 0)}%
+    - Satisfacción de Clientes: {company.get('customer_satisfaction', 0)}%
+    - Cuota de Mercado: {company.get('market_share', 0)}%
+    - Dificultad: {difficulty}
+    Genera un desafío realista en español que enfrente el CEO, con 4 opciones de respuesta (etiquetadas A, B, C, D). Incluye:
+    - Descripción del desafío
+    - 4 opciones de respuesta
+    - La opción correcta (letra)
+    - Consecuencias específicas para cada opción (sin mencionar cuál es la correcta o compararlas)
+    Devuelve la respuesta en formato JSON.
+    Ejemplo:
+    {{
+      "description": "Un cliente importante está insatisfecho...",
+      "options": {{
+        "A": "Ofrecer un descuento...",
+        "B": "Ignorar el problema...",
+        "C": "Aumentar precios...",
+        "D": "Cambiar el producto..."
+      }},
+      "correct_option": "A",
+      "consequences": {{
+        "A": "El descuento mejora la relación con el cliente.",
+        "B": "Ignorar el problema causa pérdida de confianza.",
+        "C": "Subir precios aleja al cliente.",
+        "D": "Cambiar el producto genera incertidumbre."
+      }}
+    }}
+    """
+
+# Function to build the prompt asking for the answer and consequences of a challenge the player already saw
+def completion_prompt(company, difficulty, challenge):
+    options = "\n".join(f"    {opt}. {challenge['options'][opt]}" for opt in "ABCD")
+    return f"""
+    Eres un simulador de negocios. Empresa: {company.get('products', 'No disponible')}; capital ${company.get('capital', 0)}; {company.get('employees', 0)} empleados. Dificultad: {difficulty}.
+    El CEO enfrenta este desafío:
+    {challenge['description']}
+    Opciones:
+{options}
+    Indica la opción correcta (letra) y las consecuencias específicas de cada opción (sin mencionar cuál es la correcta o compararlas).
+    Devuelve solo el JSON, sin texto adicional:
+    {{"correct_option": "A", "consequences": {{"A": "...", "B": "...", "C": "...", "D": "..."}}}}
+    """
+
+# Function to build the prompt comparing the initial and final company
+def evaluation_prompt(initial_company, final_company):
+    return f"""
+    Compara el estado inicial y final de una empresa:
+    Inicial: Capital ${initial_company.get('capital', 0)}, {initial_company.get('employees', 0)} empleados, satisfacción {initial_company.get('satisfaction', 0)}%, satisfacción de clientes {initial_company.get('customer_satisfaction', 0)}%, cuota de mercado {initial_company.get('market_share', 0)}%
+    Final: Capital ${final_company.get('capital', 0)}, {final_company.get('employees', 0)} empleados, satisfacción {final_company.get('satisfaction', 0)}%, satisfacción de clientes {final_company.get('customer_satisfaction', 0)}%, cuota de mercado {final_company.get('market_share', 0)}%
+    Determina si la empresa mejoró, empeoró o quebró. Explica por qué en español.
+    """
+
+# Wording of each target metric in batch prompts
+target_names = {
+    "capital": "capital y costos",
+    "satisfaction": "satisfacción de empleados",
+    "customer_satisfaction": "satisfacción de clientes",
+    "market_share": "cuota de mercado"
+}
+
+# Function to build the prompt asking for several challenges in one call, one per target metric
+def batch_challenge_prompt(company, difficulty, targets):
+    areas = "\n".join(f"    {number}. {target_names[target]}" for number, target in enumerate(targets, 1))
+    return f"""
+    Empresa: {company.get('products', 'No disponible')}; inventario: {company.get('inventory', 'No disponible')}; capital ${company.get('capital', 0)}; {company.get('employees', 0)} empleados; satisfacción de empleados {company.get('satisfaction', 0)}%; satisfacción de clientes {company.get('customer_satisfaction', 0)}%; cuota de mercado {company.get('market_share', 0)}%. Dificultad: {difficulty}.
+    Genera {len(targets)} desafíos realistas en español que enfrente el CEO, uno por cada área, en este orden:
+{areas}
+    Cada desafío tiene "description", "options" (A, B, C, D), "correct_option" (letra) y "consequences" para cada opción (sin mencionar cuál es la correcta o compararlas).
+    Devuelve solo una lista JSON de {len(targets)} objetos con esta forma:
+    [{{"description": "...", "options": {{"A": "...", "B": "...", "C": "...", "D": "..."}}, "correct_option": "A", "consequences": {{"A": "...", "B": "...", "C": "...", "D": "..."}}}}]
+    """
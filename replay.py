@@ -0,0 +1,105 @@
+"""Counterfactual replay of a seeded game.
+
+Each round's decision is applied with its own random stream
+(``game.round_rng(seed, round)``), so a game is a pure function of its initial
+company, the correct option and difficulty of every round's challenge, and the
+choices made. ``ReplayEngine`` recomputes any branch of that decision tree,
+keeping the challenges the player actually faced. The played path is kept
+once, and a branch only recomputes the rounds after it leaves that path. Each
+computed decision is memoized by (round, company state, choice), so branches
+reuse their common part: all 4^k endings of the last k rounds cost about
+4^k * 4/3 decisions instead of k * 4^k. The memo holds at most ``memo_size``
+decisions and drops the oldest first, so memory stays bounded however long
+the campaign is.
+"""
+import itertools
+
+import game
+
+class ReplayEngine:
+    def __init__(self, initial_company, history, seed, memo_size=4096):
+        self.seed = seed
+        self.rounds = [(record["correct_option"], record["difficulty"]) for record in history]
+        self.actual = tuple(record["choice"] for record in history)
+        self.initial = {metric: initial_company[metric] for metric in game.metrics}
+        self.memo_size = memo_size
+        self._memo = {}
+        # (metrics, bankruptcy round) after each round of the played game, from round 0
+        self._actual_path = None
+
+    # Whether every round recorded what a replay needs (saves from older versions did not)
+    @staticmethod
+    def is_replayable(history):
+        return all(record["correct_option"] and record["difficulty"] for record in history)
+
+    def __len__(self):
+        return len(self.rounds)
+
+    # Metrics and bankruptcy round after the decision of round index + 1
+    def _decide(self, values, bankrupt_round, index, choice):
+        # A bankrupt company stays as it was; the game would have ended there
+        if bankrupt_round:
+            return values, bankrupt_round
+        company = dict(zip(game.metrics, values))
+        correct_option, difficulty = self.rounds[index]
+        if game.apply_decision(company, choice, correct_option, difficulty, game.round_rng(self.seed, index + 1)):
+            bankrupt_round = index + 1
+        return tuple(company[metric] for metric in game.metrics), bankrupt_round
+
+    # _decide for a branch off the played path, memoized by (round, state, choice)
+    def _step(self, values, bankrupt_round, index, choice):
+        if bankrupt_round:
+            return values, bankrupt_round
+        key = (index, values, choice)
+        following = self._memo.get(key)
+        if following is None:
+            following = self._decide(values, bankrupt_round, index, choice)
+            if len(self._memo) >= self.memo_size:
+                del self._memo[next(iter(self._memo))]
+            self._memo[key] = following
+        return following
+
+    def _played_path(self):
+        if self._actual_path is None:
+            self._actual_path = [(tuple(self.initial.values()), 0)]
+            for index, choice in enumerate(self.actual):
+                self._actual_path.append(self._decide(*self._actual_path[-1], index, choice))
+        return self._actual_path
+
+    # Path of (metrics, bankruptcy round) at round 0..len(choices): shared with the played game up to
+    # the first round where the choices differ, walked forward from there
+    def _path(self, choices):
+        choices = tuple(choices)
+        self._played_path()
+        shared = 0
+        while shared < min(len(choices), len(self.actual)) and choices[shared] == self.actual[shared]:
+            shared += 1
+        path = self._actual_path[:shared + 1]
+        for index in range(shared, len(choices)):
+            path.append(self._step(*path[-1], index, choices[index]))
+        return path
+
+    # Company metrics and bankruptcy round (0 if none) after a sequence of choices from round 1
+    def state(self, choices):
+        values, bankrupt_round = self._path(choices)[-1]
+        return dict(zip(game.metrics, values)), bankrupt_round
+
+    # Company metrics at round 0..len(choices) along one branch
+    def trajectory(self, choices):
+        return [dict(zip(game.metrics, values)) for values, _ in self._path(choices)]
+
+    # The played choices with one round's decision replaced
+    def what_if(self, round_number, choice):
+        return self.actual[:round_number - 1] + (choice,) + self.actual[round_number:]
+
+    # Every ending of the last k rounds after the played prefix: (choices of those k rounds, company, bankruptcy round)
+    def explore(self, last_k):
+        first = len(self) - last_k
+        start = self._played_path()[first]
+        endings = []
+        for suffix in itertools.product("ABCD", repeat=last_k):
+            values, bankrupt_round = start
+            for offset, choice in enumerate(suffix):
+                values, bankrupt_round = self._step(values, bankrupt_round, first + offset, choice)
+            endings.append((suffix, dict(zip(game.metrics, values)), bankrupt_round))
+        return endings
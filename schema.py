@@ -0,0 +1,222 @@
+"""Tolerant parsing, validation and repair of LLM JSON responses.
+
+``extract_json`` returns the first balanced JSON object (or array) in a
+response, ignoring prose and code fences around it, dropping trailing commas
+and closing the brackets of a response cut off between values.
+``validate_challenge`` and ``validate_profile`` check a parsed value against the
+shape the game needs and fix what can be fixed locally (option letters written
+as "a)" or "Opción A", a missing consequence or correct option, a capital
+written as "$500,000"), returning None only when the value is unusable.
+Outcomes are counted in ``llm_parse_total`` and ``llm_repairs_total``.
+"""
+import json
+import math
+import random
+import re
+
+import game
+import metrics
+
+letters = ("A", "B", "C", "D")
+
+_letter = re.compile(r"^\W*(?:opci[oó]n\s*)?([ABCD])(?![^\W\d_])", re.IGNORECASE)
+# Whole amount, plain or grouped in thousands, and optional cents written with the other separator
+_amount = re.compile(r"^(?P<whole>\d+|\d{1,3}(?P<sep>[.,])\d{3}(?:(?P=sep)\d{3})*)(?P<cents>[.,]\d{2})?$")
+# Words scaling an amount ("1,5 millones", "500k"), which cannot be read as a plain integer
+_scale = re.compile(r"(?<![^\W\d_])(?:mil|mill[oó]n(?:es)?|millions?|thousands?|billions?|bn|mm|m|k)(?![^\W\d_])", re.IGNORECASE)
+# A minus sign before the first digit ("-500000", "$ -500", "−1.000")
+_negative = re.compile(r"^\D*[-−]")
+
+# Function to find the first balanced JSON value opening with opener; returns (value, repairs) or (None, [])
+def extract_json(text, opener="{"):
+    start = text.find(opener)
+    while start >= 0:
+        value, repairs = _balanced(text, start)
+        if value is not None:
+            return value, repairs
+        start = text.find(opener, start + 1)
+    return None, []
+
+def _balanced(text, start):
+    out = []
+    closers = []
+    repairs = []
+    in_string = escaped = False
+    for char in text[start:]:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if char != closers[-1]:
+                return None, []
+            closers.pop()
+            if _drop_trailing_comma(out):
+                repairs.append("trailing_comma")
+        out.append(char)
+        if not closers:
+            break
+    else:
+        # Cut off mid-string: nothing sensible to close
+        if in_string:
+            return None, []
+        _drop_trailing_comma(out)
+        out.extend(reversed(closers))
+        repairs.append("unclosed_brackets")
+    try:
+        return json.loads("".join(out)), repairs
+    except json.JSONDecodeError:
+        return None, []
+
+def _drop_trailing_comma(out):
+    index = len(out) - 1
+    while index >= 0 and out[index].isspace():
+        index -= 1
+    if index >= 0 and out[index] == ",":
+        del out[index]
+        return True
+    return False
+
+# Function to read an option letter out of keys or values like "a", "B)" or "Opción C"
+def letter_of(value):
+    match = _letter.match(value) if isinstance(value, str) else None
+    return match.group(1).upper() if match else None
+
+# Function to map options/consequences to exactly the letters A-D, from a dict or a list of four texts
+def _by_letter(value, repairs, name):
+    if isinstance(value, list) and len(value) == len(letters):
+        repairs.append(f"{name}_list")
+        value = dict(zip(letters, value))
+    if not isinstance(value, dict):
+        return {}
+    texts = {}
+    for key, text in value.items():
+        letter = letter_of(key)
+        if letter is None or letter in texts or not isinstance(text, (str, int, float)):
+            continue
+        if letter != key:
+            repairs.append(f"{name}_keys")
+        texts[letter] = str(text)
+    return texts
+
+# Function to read an integer written as a number or as text such as "$500,000" or "500.000 USD";
+# None for amounts that would need guessing, such as "12,5" or "$1,5 millones", and for
+# negative or non-finite ones (json.loads accepts NaN and Infinity)
+def to_int(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value) if math.isfinite(value) and value >= 0 else None
+    if not isinstance(value, str) or _scale.search(value) or _negative.match(value):
+        return None
+    match = _amount.match(re.sub(r"[^\d.,]", "", value))
+    if match is None or (match.group("cents") and match.group("cents")[0] == match.group("sep")):
+        return None
+    return int(re.sub(r"\D", "", match.group("whole")))
+
+# Function to check and repair a challenge; None when it lacks a description or any option,
+# or its correct option when guess_correct is off
+def repair_challenge(value, repairs, rng=random, guess_correct=True):
+    if not isinstance(value, dict) or not isinstance(value.get("description"), str) or not value["description"].strip():
+        return None
+    options = _by_letter(value.get("options"), repairs, "options")
+    if len(options) < len(letters):
+        return None
+    consequences = _by_letter(value.get("consequences"), repairs, "consequences")
+    for letter in letters:
+        if letter not in consequences:
+            consequences[letter] = f"Decidiste: {options[letter]}"
+            repairs.append("missing_consequence")
+    correct_option = letter_of(value.get("correct_option"))
+    if correct_option is None:
+        if not guess_correct:
+            return None
+        correct_option = rng.choice(letters)
+        repairs.append("missing_correct_option")
+    elif correct_option != value["correct_option"]:
+        repairs.append("correct_option_format")
+    return {
+        "description": value["description"],
+        "options": {letter: options[letter] for letter in letters},
+        "correct_option": correct_option,
+        "consequences": {letter: consequences[letter] for letter in letters}
+    }
+
+# Function to check and repair a company profile; None when it has neither products nor capital
+def repair_profile(value, repairs):
+    if not isinstance(value, dict):
+        return None
+    profile = {}
+    for field in ("products", "inventory"):
+        text = value.get(field)
+        if isinstance(text, str) and text.strip():
+            profile[field] = text
+        else:
+            profile[field] = game.default_profile[field]
+            repairs.append(f"missing_{field}")
+    for field in ("capital", "employees"):
+        number = to_int(value.get(field))
+        if number is None or number <= 0:
+            profile[field] = game.default_profile[field]
+            repairs.append(f"missing_{field}")
+        else:
+            profile[field] = number
+            if not isinstance(value[field], int) or isinstance(value[field], bool):
+                repairs.append(f"{field}_format")
+    if "missing_products" in repairs and "missing_capital" in repairs:
+        return None
+    personnel = value.get("personnel") if isinstance(value.get("personnel"), list) else []
+    profile["personnel"] = [
+        {"name": person["name"], "role": person["role"]}
+        for person in personnel
+        if isinstance(person, dict) and isinstance(person.get("name"), str) and isinstance(person.get("role"), str)
+    ]
+    if len(profile["personnel"]) < len(personnel):
+        repairs.append("personnel_entries")
+    if not profile["personnel"]:
+        profile["personnel"] = [dict(person) for person in game.default_profile["personnel"]]
+        repairs.append("missing_personnel")
+    return profile
+
+def _count(kind, value, repairs):
+    metrics.inc("llm_parse_total", kind=kind, result="failed" if value is None else "repaired" if repairs else "ok")
+    for repair in set(repairs):
+        metrics.inc("llm_repairs_total", kind=kind, repair=repair)
+    return value
+
+# Function to validate an already parsed challenge (e.g. a finished stream), counting the outcome
+def validate_challenge(value, kind="challenge", guess_correct=True):
+    repairs = []
+    return _count(kind, repair_challenge(value, repairs, guess_correct=guess_correct), repairs)
+
+# Function to parse one challenge out of a response, or None
+def parse_challenge(text, kind="challenge", guess_correct=True):
+    value, repairs = extract_json(text)
+    challenge = repair_challenge(value, repairs, guess_correct=guess_correct) if value is not None else None
+    return _count(kind, challenge, repairs)
+
+# Function to parse a list of challenges out of a response, keeping the usable ones
+def parse_challenges(text, kind="challenge_batch", guess_correct=True):
+    values, repairs = extract_json(text, "[")
+    if not isinstance(values, list):
+        _count(kind, None, [])
+        return []
+    challenges = []
+    for value in values:
+        item_repairs = list(repairs)
+        challenge = _count(kind, repair_challenge(value, item_repairs, guess_correct=guess_correct), item_repairs)
+        if challenge is not None:
+            challenges.append(challenge)
+    return challenges
+
+# Function to parse a company profile out of a response, or None
+def parse_profile(text):
+    value, repairs = extract_json(text)
+    return _count("profile", repair_profile(value, repairs) if value is not None else None, repairs)
@@ -0,0 +1,115 @@
+from array import array
+
+# Chart columns, keyed by the company field they plot
+chart_labels = {
+    "capital": "Capital",
+    "satisfaction": "Satisfacción de Empleados",
+    "customer_satisfaction": "Satisfacción de Clientes",
+    "market_share": "Cuota de Mercado"
+}
+
+# Metrics plotted together in each trend chart
+chart_groups = [["capital"], ["satisfaction", "customer_satisfaction"], ["market_share"]]
+
+# Points sent to the browser per chart line, however long the campaign
+chart_point_budget = 300
+
+# Rounds averaged by the rolling aggregates
+rolling_window = 10
+
+# Function to pick at most budget indices of (x, y) that keep its visual shape
+# (Largest-Triangle-Three-Buckets); the first and last points are always kept
+def lttb_indices(x, y, budget):
+    import numpy as np
+    n = len(x)
+    if budget >= n or budget < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, budget - 1).astype(np.int64)
+    selected = np.empty(budget, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(budget - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        # Average of the next bucket (the last point for the final one) as the third vertex
+        following = slice(stop, edges[bucket + 2]) if bucket + 2 < len(edges) else slice(n - 1, n)
+        next_x, next_y = x[following].mean(), y[following].mean()
+        areas = np.abs((x[previous] - next_x) * (y[start:stop] - y[previous]) - (x[previous] - x[start:stop]) * (next_y - y[previous]))
+        previous = start + int(areas.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+class MetricSeries:
+    """Append-only per-session metric history backing the trend charts.
+
+    Round 0 holds the initial company. Chart frames are built once per version
+    and reused by every rerun until the next round is appended; long series are
+    downsampled to ``chart_point_budget`` points per line. Minimum, maximum,
+    mean and the mean of the last ``rolling_window`` rounds are kept up to date
+    on every append, so ``aggregates`` never rescans the series.
+    """
+
+    def __init__(self, initial_company):
+        self.rounds = array("l", [0])
+        self.values = {metric: array("d", [initial_company.get(metric, 0)]) for metric in chart_labels}
+        self.version = 0
+        self._totals = {metric: values[0] for metric, values in self.values.items()}
+        self._window_totals = dict(self._totals)
+        self._minimums = dict(self._totals)
+        self._maximums = dict(self._totals)
+        self._frames = None
+        self._frames_version = -1
+
+    @classmethod
+    def from_history(cls, initial_company, history):
+        series = cls(initial_company)
+        for record in history:
+            series.append(record["round"], record)
+        return series
+
+    def __len__(self):
+        return len(self.rounds)
+
+    def append(self, round_number, company):
+        self.rounds.append(round_number)
+        for metric, values in self.values.items():
+            values.append(company.get(metric, 0))
+            value = values[-1]
+            self._totals[metric] += value
+            self._window_totals[metric] += value
+            if len(values) > rolling_window:
+                self._window_totals[metric] -= values[-rolling_window - 1]
+            self._minimums[metric] = min(self._minimums[metric], value)
+            self._maximums[metric] = max(self._maximums[metric], value)
+        self.version += 1
+
+    # Per metric: current value, mean of the last rolling_window rounds, overall mean, minimum and maximum
+    def aggregates(self):
+        count = len(self)
+        return {
+            metric: {
+                "current": self.values[metric][-1],
+                "rolling_mean": self._window_totals[metric] / min(count, rolling_window),
+                "mean": self._totals[metric] / count,
+                "min": self._minimums[metric],
+                "max": self._maximums[metric]
+            }
+            for metric in chart_labels
+        }
+
+    # The three trend chart frames, rebuilt (and downsampled) only after an append
+    def chart_frames(self):
+        if self._frames_version != self.version:
+            import numpy as np
+            import pandas as pd  # deferred so app start-up does not pay for pandas
+            rounds = np.array(self.rounds)
+            self._frames = []
+            for group in chart_groups:
+                columns = {metric: np.frombuffer(self.values[metric], dtype=np.float64) for metric in group}
+                # Keep the shape-defining points of every line in the chart
+                keep = np.unique(np.concatenate([lttb_indices(rounds, values, chart_point_budget) for values in columns.values()]))
+                index = pd.Index(rounds[keep], name="Ronda")
+                self._frames.append(pd.DataFrame({chart_labels[metric]: values[keep] for metric, values in columns.items()}, index=index))
+            self._frames_version = self.version
+        return self._frames
@@ -0,0 +1,199 @@
+"""Disk-backed game sessions with a bounded set kept in memory.
+
+Each game is written through to SQLite whenever it changes: a small header row
+per session id, rewritten each time, plus one row per played round that is only
+ever appended, so a write costs the same in round 1000 as in round 1.
+``claim`` gives each session id to one live session at a time.
+
+A session keeps its game objects in the ``GameState`` of its ``Resident``
+handle rather than in ``st.session_state``. ``touch`` tracks which sessions are
+resident in this process, most recently used last, and releases the game of
+those beyond ``max_resident`` or idle for longer than ``idle_seconds`` by
+emptying that ``GameState``, so the memory is freed at once without touching
+another session's Streamlit state. The session's next rerun finds its game
+missing and reloads it with ``load``, as does a new process serving a session
+id it has never seen.
+"""
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ceo", "sessions.sqlite3")
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+class GameState(dict):
+    """One session's game objects, read and written like ``st.session_state`` (``state.company``)."""
+
+    __slots__ = ()
+
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key) from None
+
+    def __setattr__(self, key, value):
+        self[key] = value
+
+    def __delattr__(self, key):
+        try:
+            del self[key]
+        except KeyError:
+            raise AttributeError(key) from None
+
+class Resident:
+    """Handle stored in a session's own state; the store holds it weakly so closed sessions drop out.
+
+    The only write another session's thread makes is ``release``, a single ``dict.clear`` of the
+    game. Sessions are only released once idle for ``min_idle_seconds``, never during a rerun.
+    """
+
+    __slots__ = ("session_id", "game", "__weakref__")
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.game = GameState()
+
+    # Drop the game's objects so their memory can be reclaimed
+    def release(self):
+        self.game.clear()
+
+class SessionStore:
+    """Write-through session headers and round rows plus the LRU of sessions resident in memory.
+
+    Sessions used within ``min_idle_seconds`` are never evicted, so a rerun in
+    progress keeps its state even when more than ``max_resident`` players are
+    active at once, as long as ``min_idle_seconds`` exceeds the slowest rerun.
+    Rows not written for ``ttl_seconds`` are deleted.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_resident=200, idle_seconds=900, min_idle_seconds=60,
+                 ttl_seconds=30 * 24 * 3600):
+        self.path = path
+        self.max_resident = max_resident
+        self.idle_seconds = idle_seconds
+        self.min_idle_seconds = min_idle_seconds
+        self.ttl_seconds = ttl_seconds
+        self.stats = {"writes": 0, "loads": 0, "evictions": 0}
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._resident = OrderedDict()
+        self._owners = weakref.WeakValueDictionary()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, payload BLOB NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_rounds ("
+            "id TEXT NOT NULL, idx INTEGER NOT NULL, record BLOB NOT NULL, PRIMARY KEY (id, idx)) WITHOUT ROWID"
+        )
+
+    # Return a session's stored header payload and its round records in order, or (None, []); safe from any thread
+    def load(self, session_id):
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None, []
+            records = self._conn.execute(
+                "SELECT record FROM session_rounds WHERE id = ? ORDER BY idx", (session_id,)
+            ).fetchall()
+            self.stats["loads"] += 1
+        return bytes(row[0]), [bytes(record) for record, in records]
+
+    # Write a session's header through and append its round records from index start on (start 0
+    # replaces them all); returns False, writing nothing, when the stored rounds do not end at start.
+    # Also drops sessions past their TTL
+    def save(self, session_id, payload, records=(), start=0):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                if start:
+                    stored = self._conn.execute(
+                        "SELECT MAX(idx) FROM session_rounds WHERE id = ?", (session_id,)
+                    ).fetchone()[0]
+                    if stored is None or stored + 1 != start:
+                        self._conn.execute("ROLLBACK")
+                        return False
+                else:
+                    self._conn.execute("DELETE FROM session_rounds WHERE id = ?", (session_id,))
+                self._conn.execute(
+                    "INSERT INTO sessions (id, payload, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (id) DO UPDATE SET payload = excluded.payload, updated_at = excluded.updated_at",
+                    (session_id, payload, now),
+                )
+                self._conn.executemany(
+                    "INSERT INTO session_rounds (id, idx, record) VALUES (?, ?, ?)",
+                    [(session_id, start + offset, record) for offset, record in enumerate(records)],
+                )
+                self._conn.execute(
+                    "DELETE FROM session_rounds WHERE id IN (SELECT id FROM sessions WHERE updated_at < ?)",
+                    (now - self.ttl_seconds,),
+                )
+                self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl_seconds,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.stats["writes"] += 1
+        return True
+
+    def delete(self, session_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM session_rounds WHERE id = ?", (session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    # Give a session id to resident unless another live session already holds it; returns whether it did
+    def claim(self, session_id, resident):
+        with self._lock:
+            owner = self._owners.get(session_id)
+            if owner is not None and owner is not resident:
+                return False
+            self._owners[session_id] = resident
+            resident.session_id = session_id
+            return True
+
+    # Mark a resident session as used now and release the games of the least recently used ones over budget
+    def touch(self, resident):
+        now = time.time()
+        with self._lock:
+            self._resident.pop(id(resident), None)
+            self._resident[id(resident)] = (weakref.ref(resident), now)
+            while len(self._resident) > 1:
+                oldest_id, (ref, last_used) = next(iter(self._resident.items()))
+                idle = now - last_used
+                alive = ref()
+                if alive is not None and idle < self.idle_seconds and (
+                    len(self._resident) <= self.max_resident or idle < self.min_idle_seconds
+                ):
+                    break
+                del self._resident[oldest_id]
+                if alive is not None:
+                    alive.release()
+                    self.stats["evictions"] += 1
+
+    def __len__(self):
+        with self._lock:
+            return len(self._resident)
+
+    # Gauges exported through metrics.register_collector
+    def gauges(self):
+        return {"sessions_resident": len(self), **{f"sessions_{name}_total": value for name, value in self.stats.items()}}
+
+# One store per path for the whole process, shared by all sessions
+def get_store(path=DEFAULT_PATH, **options):
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = SessionStore(path, **options)
+        return store
@@ -0,0 +1,146 @@
+"""Headless, NumPy-vectorized Monte Carlo engine for the game economy.
+
+Advances whole batches of companies through the rules in ``game.py`` without
+Streamlit or the LLM. Every game draws its own stream of uniforms (a policy
+draw plus the five impact draws per round), so any single game can be replayed
+through the scalar ``game.apply_decision`` and must match the batched result.
+
+    python simulation.py --games 1000000 --p-correct 0.6
+"""
+import argparse
+import json
+
+import numpy as np
+
+import game
+
+# Uniforms drawn per round: policy, capital, employees, satisfaction, customer_satisfaction, market_share
+draws_per_round = 6
+
+# Games per RNG chunk; each chunk has its own seed so batches can be processed independently
+chunk_size = 16384
+
+default_company = {"capital": 500000, "employees": 50, **game.initial_metrics}
+
+# Function to build the bit generator of one chunk of games
+def _chunk_bit_generator(seed, chunk):
+    return np.random.PCG64(np.random.SeedSequence([seed, chunk]))
+
+# Function to draw the uniforms of games [start, stop) in one chunk, shape (games, rounds, draws)
+def _chunk_variates(seed, chunk, start, stop, rounds):
+    bit_generator = _chunk_bit_generator(seed, chunk)
+    bit_generator.advance(start * rounds * draws_per_round)
+    return np.random.Generator(bit_generator).random((stop - start, rounds, draws_per_round))
+
+# Function to get the uniforms of a single game, as consumed by the scalar path
+def game_variates(seed, game_index, rounds=game.default_rounds):
+    chunk, offset = divmod(game_index, chunk_size)
+    return _chunk_variates(seed, chunk, offset, offset + 1, rounds)[0]
+
+# Function to map uniforms to randint(a, b) exactly like game.UniformStream
+def _randint(u, a, b):
+    return a + np.floor(u * (b - a + 1))
+
+# Function to advance a batch of companies through all rounds
+def _simulate_chunk(variates, difficulty, p_correct, initial):
+    games, rounds, _ = variates.shape
+    multiplier = game.difficulty_multipliers[difficulty]
+    capital = np.full(games, initial["capital"], dtype=np.float64)
+    employees = np.full(games, initial["employees"], dtype=np.float64)
+    satisfaction = np.full(games, initial["satisfaction"], dtype=np.float64)
+    customer = np.full(games, initial["customer_satisfaction"], dtype=np.float64)
+    market = np.full(games, initial["market_share"], dtype=np.float64)
+    bankrupt_round = np.zeros(games, dtype=np.int32)
+    correct_answers = np.zeros(games, dtype=np.int32)
+    alive = np.ones(games, dtype=bool)
+    p_correct = np.broadcast_to(np.asarray(p_correct, dtype=np.float64), (games, rounds))
+
+    for r in range(rounds):
+        u = variates[:, r, :]
+        correct = u[:, 0] < p_correct[:, r]
+        sign = np.where(correct, 1.0, -1.0)
+        capital_delta = sign * np.trunc(capital * (0.01 + (0.05 - 0.01) * u[:, 1]) * multiplier["capital"])
+        employees_delta = sign * _randint(u[:, 2], 0, 1)
+        satisfaction_delta = np.where(correct, _randint(u[:, 3], 3, 8), -_randint(u[:, 3], 5, 10)) * multiplier["satisfaction"]
+        customer_delta = np.where(correct, _randint(u[:, 4], 3, 8), -_randint(u[:, 4], 5, 10)) * multiplier["customer_satisfaction"]
+        market_delta = sign * ((0.5 + (2.0 - 0.5) * u[:, 5]) * multiplier["market_share"])
+
+        capital = np.where(alive, np.maximum(1000, capital + capital_delta), capital)
+        employees = np.where(alive, np.maximum(1, employees + employees_delta), employees)
+        satisfaction = np.where(alive, np.clip(satisfaction + satisfaction_delta, 0, 100), satisfaction)
+        customer = np.where(alive, np.clip(customer + customer_delta, 0, 100), customer)
+        market = np.where(alive, np.clip(market + market_delta, 0, 100), market)
+        correct_answers += (alive & correct)
+
+        bankrupt = alive & (((capital <= 10000) & (satisfaction <= 20)) | (customer <= 10) | (market <= 5))
+        bankrupt_round[bankrupt] = r + 1
+        alive &= ~bankrupt
+
+    return {
+        "capital": capital.astype(np.int64),
+        "employees": employees.astype(np.int64),
+        "satisfaction": satisfaction,
+        "customer_satisfaction": customer,
+        "market_share": market,
+        "correct_answers": correct_answers,
+        "bankrupt_round": bankrupt_round,
+    }
+
+# Function to simulate n_games full games; p_correct is a scalar, a per-round array or a (games, rounds) array
+def simulate(n_games, difficulty="Medium", p_correct=0.5, rounds=game.default_rounds, seed=0, initial=None):
+    initial = {**default_company, **(initial or {})}
+    p_correct = np.asarray(p_correct, dtype=np.float64)
+    parts = []
+    for start in range(0, n_games, chunk_size):
+        stop = min(n_games, start + chunk_size)
+        chunk = start // chunk_size
+        chunk_policy = p_correct[start:stop] if p_correct.ndim == 2 else p_correct
+        parts.append(_simulate_chunk(_chunk_variates(seed, chunk, 0, stop - start, rounds), difficulty, chunk_policy, initial))
+    return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+# Function to replay one game through the scalar rules with the engine's random stream
+def replay_game(game_index, difficulty="Medium", p_correct=0.5, rounds=game.default_rounds, seed=0, initial=None):
+    company = {**default_company, **(initial or {})}
+    p_correct = np.asarray(p_correct, dtype=np.float64)
+    result = {"correct_answers": 0, "bankrupt_round": 0}
+    for r, uniforms in enumerate(game_variates(seed, game_index, rounds)):
+        p = p_correct[game_index, r] if p_correct.ndim == 2 else p_correct[r] if p_correct.ndim == 1 else float(p_correct)
+        rng = game.UniformStream(uniforms)
+        choice = "A" if rng.random() < p else "B"
+        result["correct_answers"] += choice == "A"
+        if game.apply_decision(company, choice, "A", difficulty, rng):
+            result["bankrupt_round"] = r + 1
+            break
+    return {**{metric: company[metric] for metric in game.metrics}, **result}
+
+# Function to summarize a simulation into final-metric percentiles and bankruptcy rate
+def summarize(result, percentiles=(5, 25, 50, 75, 95)):
+    bankrupt_round = result["bankrupt_round"]
+    bankrupt = bankrupt_round > 0
+    summary = {
+        "games": int(bankrupt_round.size),
+        "bankruptcy_rate": float(bankrupt.mean()),
+        "bankruptcy_round": {f"p{p}": float(np.percentile(bankrupt_round[bankrupt], p)) for p in percentiles} if bankrupt.any() else {},
+        "correct_answers_mean": float(result["correct_answers"].mean()),
+    }
+    for metric in game.metrics:
+        values = result[metric]
+        summary[metric] = {"mean": float(values.mean()), **{f"p{p}": float(np.percentile(values, p)) for p in percentiles}}
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo balance report per difficulty")
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=game.default_rounds)
+    parser.add_argument("--p-correct", type=float, default=0.5, help="probability of picking correct_option each round")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--difficulty", choices=game.difficulties, action="append")
+    args = parser.parse_args()
+    report = {
+        difficulty: summarize(simulate(args.games, difficulty, args.p_correct, args.rounds, args.seed))
+        for difficulty in (args.difficulty or game.difficulties)
+    }
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Incremental parsing of streamed challenge JSON.
+
+``IncrementalJSONParser`` consumes text chunks and reports each scalar value as
+soon as it is complete, keyed by its path (``("options", "B")``). Text before
+the first ``{`` (such as a markdown code fence) is skipped; when what follows a
+``{`` turns out not to be JSON before any value was reported (a brace in a
+prose preamble), parsing restarts at the next ``{``, as ``schema.extract_json``
+does. ``ChallengeDraft`` feeds a chunk stream through the parser in a background
+thread so the page can render the description and options while the rest of the
+challenge arrives.
+"""
+import json
+import threading
+from collections import deque
+
+class IncrementalJSONParser:
+    def __init__(self):
+        self._reset()
+        self._emitted = False
+
+    def _reset(self):
+        self._stack = []  # [container, key_or_index, expecting] per open object/array
+        self._string = None
+        self._escape = False
+        self._scalar = None
+        self._started = False
+        self._replay = None  # text since the current "{" until the first value is reported
+        self.finished = False
+
+    # Feed a chunk of text; returns the (path, value) pairs completed by it
+    def feed(self, text):
+        events = []
+        if self._emitted:
+            # Past the first value there is nothing left to restart
+            for char in text:
+                if self.finished:
+                    break
+                self._feed_char(char, events)
+            return events
+        pending = deque(text)
+        while pending and not self.finished:
+            char = pending.popleft()
+            try:
+                self._feed_char(char, events)
+                if self.finished and not events:
+                    raise ValueError("object without values")
+            except ValueError:
+                if events:
+                    raise
+                # Not the JSON after all: start over right after the "{" it opened with
+                replay = self._replay[1:] + [char]
+                self._reset()
+                pending.extendleft(reversed(replay))
+                continue
+            if events:
+                self._emitted = True
+                self._replay = None
+            elif self._replay is not None:
+                self._replay.append(char)
+        return events
+
+    def _feed_char(self, char, events):
+        if self._string is not None:
+            self._feed_string(char, events)
+        elif not self._started:
+            if char == "{":
+                self._started = True
+                self._stack.append(["object", None, "key"])
+                self._replay = []
+        else:
+            self._feed_structure(char, events)
+
+    def _path(self):
+        return tuple(frame[1] for frame in self._stack)
+
+    def _feed_string(self, char, events):
+        if self._escape:
+            self._escape = False
+            self._string.append(char)
+        elif char == "\\":
+            self._escape = True
+            self._string.append(char)
+        elif char == '"':
+            value = json.loads('"' + "".join(self._string) + '"')
+            self._string = None
+            frame = self._stack[-1]
+            if frame[0] == "object" and frame[2] == "key":
+                frame[1] = value
+                frame[2] = "colon"
+            else:
+                events.append((self._path(), value))
+                frame[2] = "comma"
+        else:
+            self._string.append(char)
+
+    def _end_scalar(self, events):
+        if self._scalar is not None:
+            events.append((self._path(), json.loads("".join(self._scalar))))
+            self._scalar = None
+            self._stack[-1][2] = "comma"
+
+    def _feed_structure(self, char, events):
+        frame = self._stack[-1]
+        if self._scalar is not None:
+            if char in ",}] \t\r\n":
+                self._end_scalar(events)
+            else:
+                self._scalar.append(char)
+                return
+        if char in " \t\r\n":
+            return
+        expecting = frame[2]
+        if char == '"':
+            _expect(expecting in ("key", "value"), char)
+            self._string = []
+        elif char == ":":
+            _expect(expecting == "colon", char)
+            frame[2] = "value"
+        elif char == ",":
+            _expect(expecting == "comma", char)
+            if frame[0] == "array":
+                frame[1] += 1
+                frame[2] = "value"
+            else:
+                frame[2] = "key"
+        elif char == "{":
+            _expect(expecting == "value", char)
+            self._stack.append(["object", None, "key"])
+        elif char == "[":
+            _expect(expecting == "value", char)
+            self._stack.append(["array", 0, "value"])
+        elif char in "}]":
+            _expect(char == ("}" if frame[0] == "object" else "]") and expecting in ("comma", "key" if frame[0] == "object" else "value"), char)
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][2] = "comma"
+            else:
+                self.finished = True
+        else:
+            _expect(expecting == "value", char)
+            self._scalar = [char]
+
+def _expect(condition, char):
+    if not condition:
+        raise ValueError(f"unexpected {char!r}")
+
+class ChallengeDraft:
+    """Challenge being filled in from a background stream of text chunks."""
+
+    def __init__(self, chunks, on_complete=None):
+        self.fields = {"options": {}, "consequences": {}}
+        self.version = 0
+        self.done = False
+        self.error = None
+        self._on_complete = on_complete
+        self._condition = threading.Condition()
+        threading.Thread(target=self._run, args=(chunks,), name="challenge-stream", daemon=True).start()
+
+    def _run(self, chunks):
+        parser = IncrementalJSONParser()
+        try:
+            for chunk in chunks:
+                for path, value in parser.feed(chunk):
+                    with self._condition:
+                        if len(path) == 1:
+                            self.fields[path[0]] = value
+                        elif len(path) == 2 and isinstance(self.fields.get(path[0]), dict):
+                            self.fields[path[0]][path[1]] = value
+                        self.version += 1
+                        self._condition.notify_all()
+        except Exception as e:
+            self.error = e
+        with self._condition:
+            self.done = True
+            self.version += 1
+            self._condition.notify_all()
+        if self._on_complete:
+            self._on_complete(self)
+
+    @property
+    def options_ready(self):
+        return all(opt in self.fields["options"] for opt in "ABCD")
+
+    # Block until the draft changes past `version` (or is done); returns the new version
+    def wait(self, version, timeout=None):
+        with self._condition:
+            self._condition.wait_for(lambda: self.version != version or self.done, timeout)
+            return self.version
+
+    # Block until the stream has finished
+    def join(self, timeout=None):
+        with self._condition:
+            self._condition.wait_for(lambda: self.done, timeout)
+
+    def snapshot(self):
+        with self._condition:
+            return {
+                **self.fields,
+                "options": dict(self.fields["options"]),
+                "consequences": dict(self.fields["consequences"]),
+            }
+
+    # The complete challenge, or None if the stream ended without every field
+    def challenge(self):
+        challenge = self.snapshot()
+        if (
+            isinstance(challenge.get("description"), str)
+            and challenge.get("correct_option") in ("A", "B", "C", "D")
+            and all(opt in challenge["options"] and opt in challenge["consequences"] for opt in "ABCD")
+        ):
+            return challenge
+        return None
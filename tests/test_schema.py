@@ -0,0 +1,79 @@
+"""Parsing and repair of the responses the model actually sends back."""
+import json
+
+import pytest
+
+import game
+from schema import extract_json, letters, parse_challenge, parse_challenges, parse_profile, to_int, validate_challenge
+
+options = {"A": "Negociar", "B": "Cambiar de proveedor", "C": "Aceptar", "D": "Pausar la línea"}
+challenge = {"description": "Un proveedor sube precios", "options": options, "correct_option": "B",
+             "consequences": {letter: f"Resultado {letter}" for letter in letters}}
+
+@pytest.mark.parametrize("value, expected", [
+    ("500000", 500000),
+    ("$500,000", 500000),
+    ("500.000 USD", 500000),
+    ("1.500,50", 1500),
+    ("12,5", None),
+    ("$1,5 millones", None),
+    ("500k", None),
+    (42.9, 42),
+    (True, None),
+    (json.loads("NaN"), None),
+    (json.loads("Infinity"), None),
+    (json.loads("1e400"), None),
+    (-5, None),
+    ("-500000", None),
+    ("$ -500,000", None),
+])
+def test_to_int(value, expected):
+    assert to_int(value) == expected
+
+@pytest.mark.parametrize("text, expected", [
+    ('Claro:\n```json\n{"a": 1}\n```', ({"a": 1}, [])),
+    ('{"a": [1, 2,],}', ({"a": [1, 2]}, ["trailing_comma", "trailing_comma"])),
+    ('{"a": {"b": 1', ({"a": {"b": 1}}, ["unclosed_brackets"])),
+    ('Formato {JSON}: {"a": 1}', ({"a": 1}, [])),
+    ("sin JSON", (None, [])),
+])
+def test_extract_json(text, expected):
+    assert extract_json(text) == expected
+
+def test_challenge_ok():
+    assert parse_challenge(json.dumps(challenge)) == challenge
+
+def test_challenge_letter_formats():
+    response = {**challenge, "options": {f"{k.lower()})": v for k, v in options.items()}, "correct_option": "Opción B"}
+    assert parse_challenge(json.dumps(response)) == challenge
+
+def test_challenge_option_list():
+    assert parse_challenge(json.dumps({**challenge, "options": list(options.values())})) == challenge
+
+def test_challenge_missing_consequence():
+    parsed = parse_challenge(json.dumps({**challenge, "consequences": {"A": "Resultado A"}}))
+    assert parsed["consequences"]["D"] == "Decidiste: Pausar la línea"
+
+def test_challenge_three_options():
+    assert parse_challenge(json.dumps({**challenge, "options": {"A": "x", "B": "y", "C": "z"}})) is None
+
+def test_challenge_answer_guessed_only_when_allowed():
+    response = json.dumps({**challenge, "correct_option": "?"})
+    assert parse_challenge(response, guess_correct=False) is None
+    assert parse_challenge(response)["correct_option"] in letters
+    assert validate_challenge({**challenge, "correct_option": None}, guess_correct=False) is None
+
+def test_challenge_batch_keeps_usable():
+    response = json.dumps([challenge, {"description": ""}, {**challenge, "correct_option": None}])
+    assert parse_challenges(response, guess_correct=False) == [challenge]
+
+def test_profile_capital_text():
+    assert parse_profile('{"products": "Café", "capital": "USD 750,000", "employees": "30 empleados"}')["capital"] == 750000
+
+@pytest.mark.parametrize("capital", ['"$1,5 millones"', "NaN", "-500000", '"-500000"'])
+def test_profile_unusable_capital_falls_back(capital):
+    profile = parse_profile(f'{{"products": "Café", "capital": {capital}, "employees": 3}}')
+    assert profile["capital"] == game.default_profile["capital"]
+
+def test_profile_unusable():
+    assert parse_profile('{"inventory": "x", "capital": "mucho"}') is None
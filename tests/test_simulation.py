@@ -0,0 +1,37 @@
+"""The batched engine must match scalar replays of the same games through ``game.apply_decision``."""
+import numpy as np
+import pytest
+
+import game
+import simulation
+
+# Crosses a chunk boundary, so games of the second chunk are replayed too
+n_games = simulation.chunk_size + 3000
+
+# Function to return the fields where a batched game differs from its scalar replay
+def mismatches(result, game_index, **options):
+    expected = simulation.replay_game(game_index, **options)
+    return {key: (result[key][game_index].item(), value) for key, value in expected.items() if result[key][game_index] != value}
+
+@pytest.mark.parametrize("difficulty", game.difficulties)
+def test_batched_matches_scalar(difficulty):
+    result = simulation.simulate(n_games, difficulty, 0.5, seed=7)
+    for game_index in np.unique(np.linspace(0, n_games - 1, 60).astype(int)).tolist():
+        assert mismatches(result, game_index, difficulty=difficulty, p_correct=0.5, seed=7) == {}
+
+def test_per_round_and_per_game_policies():
+    rounds = 12
+    per_round = np.linspace(0.2, 0.9, rounds)
+    per_game = np.random.default_rng(1).random((200, rounds))
+    initial = {"capital": 80000, "satisfaction": 40}
+    for p_correct in (per_round, per_game):
+        result = simulation.simulate(200, "Hard", p_correct, rounds, seed=3, initial=initial)
+        for game_index in range(0, 200, 9):
+            assert mismatches(result, game_index, difficulty="Hard", p_correct=p_correct, rounds=rounds, seed=3,
+                              initial=initial) == {}
+
+def test_summarize():
+    summary = simulation.summarize(simulation.simulate(2000, "Medium", 0.6, seed=0))
+    assert summary["games"] == 2000
+    assert 0 <= summary["bankruptcy_rate"] <= 1
+    assert set(game.metrics) <= set(summary)
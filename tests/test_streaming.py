@@ -0,0 +1,61 @@
+"""Incremental parsing of streamed challenges, checked against json.loads over random chunkings."""
+import json
+import random
+
+import pytest
+
+from streaming import ChallengeDraft, IncrementalJSONParser
+
+challenge = {
+    "description": "Un proveedor clave {\"urgente\"} sube precios un 20%\ny exige pago anticipado",
+    "options": {"A": "Negociar", "B": "Cambiar de proveedor", "C": "Aceptar", "D": "Pausar la línea"},
+    "correct_option": "A",
+    "consequences": {"A": "Ahorro", "B": "Retraso", "C": "Menos margen", "D": "Ventas perdidas"},
+    "impact": [1, -2.5, True, None, {"capital": 1e3}]
+}
+
+# Each response wrapped the way the model tends to wrap it
+responses = {
+    "bare": json.dumps(challenge),
+    "fenced": "```json\n" + json.dumps(challenge, ensure_ascii=False, indent=2) + "\n```",
+    "preamble": "Aquí tienes el desafío {en formato JSON}:\n" + json.dumps(challenge, ensure_ascii=False),
+    "braces in preamble": "Usa {\"clave\"} o {a: 1} o {} y luego " + json.dumps(challenge),
+}
+
+# Function to flatten a parsed value into the (path, value) events the parser reports
+def expected_events(value, path=()):
+    if isinstance(value, dict):
+        return [event for key, item in value.items() for event in expected_events(item, path + (key,))]
+    if isinstance(value, list):
+        return [event for index, item in enumerate(value) for event in expected_events(item, path + (index,))]
+    return [(path, value)]
+
+@pytest.mark.parametrize("name", responses)
+def test_random_chunkings(name):
+    text = responses[name]
+    rng = random.Random(name)
+    for _ in range(200):
+        parser = IncrementalJSONParser()
+        events = []
+        position = 0
+        while position < len(text):
+            size = rng.randint(1, 16)
+            events.extend(parser.feed(text[position:position + size]))
+            position += size
+        assert events == expected_events(challenge)
+        assert parser.finished
+
+def test_draft_fills_in_challenge():
+    text = responses["fenced"]
+    draft = ChallengeDraft(text[i:i + 7] for i in range(0, len(text), 7))
+    draft.join(5)
+    assert draft.done and draft.error is None
+    assert draft.options_ready
+    assert draft.challenge()["consequences"] == challenge["consequences"]
+
+def test_draft_without_answer_is_incomplete():
+    partial = {key: value for key, value in challenge.items() if key != "correct_option"}
+    draft = ChallengeDraft([json.dumps(partial)])
+    draft.join(5)
+    assert draft.options_ready
+    assert draft.challenge() is None
@@ -0,0 +1,234 @@
+"""Headless tournament of automated CEO policies over full games.
+
+Plays each policy through the same rules as the app (``game.apply_decision`` on
+``game.create_fallback_challenge`` challenges) without Streamlit. Games are split
+into chunks fanned out over a process pool; every chunk seeds its own RNG from
+(seed, policy, difficulty, chunk), so results do not depend on the number of
+workers or on the order chunks finish in. Chunk results stream back as they
+complete (to stderr and optionally a JSONL file) and are folded into a
+leaderboard per difficulty.
+
+    python tournament.py --games 10000 --workers 8
+    python tournament.py --games 100 --policy llm --stub
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import game
+import llm
+from simulation import default_company
+
+# Option wording the weakest-metric heuristic favours, per metric it tries to lift
+metric_keywords = {
+    "capital": ["optimizar", "costos", "ahorr", "eficien"],
+    "satisfaction": ["bonos", "capacitación", "incentiv", "motiv"],
+    "customer_satisfaction": ["responder", "solución", "cliente", "confianza"],
+    "market_share": ["marketing", "calidad", "destacar", "innov"]
+}
+
+# Wording of passive or harmful options the heuristic avoids
+penalty_keywords = ["ignorar", "mantener", "sin cambios", "despedir", "reducir la calidad", "reducir beneficios",
+                    "demandar", "aumentar la carga", "aumentar precios", "reducir la interacción"]
+
+# Per-process LLM client of the llm policy, built by _init_worker
+_client = None
+
+def correct_policy(company, initial, challenge, rng):
+    return challenge["correct_option"]
+
+def random_policy(company, initial, challenge, rng):
+    return rng.choice("ABCD")
+
+# Policy picking the option whose wording best addresses the weakest metric
+def weakest_metric_policy(company, initial, challenge, rng):
+    keywords = metric_keywords[game.metrics_by_weakness(company, initial)[0]]
+    scores = {}
+    for option, text in challenge["options"].items():
+        text = text.lower()
+        scores[option] = sum(keyword in text for keyword in keywords) - 2 * sum(keyword in text for keyword in penalty_keywords)
+    best = max(scores.values())
+    return rng.choice([option for option, score in scores.items() if score == best])
+
+# Function to build the prompt of the LLM agent for one decision
+def agent_prompt(company, challenge):
+    options = "\n".join(f"    {opt}: {text}" for opt, text in challenge["options"].items())
+    return f"""
+    Eres el CEO de una empresa con los siguientes indicadores:
+    - Capital: ${company['capital']:,}
+    - Empleados: {company['employees']}
+    - Satisfacción de Empleados: {company['satisfaction']}%
+    - Satisfacción de Clientes: {company['customer_satisfaction']}%
+    - Cuota de Mercado: {company['market_share']}%
+    Desafío: {challenge['description']}
+    Opciones:
+{options}
+    Responde solo con la letra de la opción que elegirías (A, B, C o D).
+    """
+
+# Policy asking the LLM for a decision; falls back to a random option when it fails or answers off-format
+def llm_policy(company, initial, challenge, rng):
+    try:
+        match = re.search(r"\b([ABCD])\b", _client.generate(agent_prompt(company, challenge)))
+    except llm.LLMError:
+        match = None
+    return match.group(1) if match else rng.choice("ABCD")
+
+policies = {
+    "correct": correct_policy,
+    "random": random_policy,
+    "weakest": weakest_metric_policy,
+    "llm": llm_policy
+}
+
+# Function to set up a pool worker; only the llm policy needs a client
+def _init_worker(llm_settings):
+    global _client
+    if not llm_settings:
+        return
+    if llm_settings["backend"] == "stub":
+        backend = llm.StubBackend(llm_settings["latency"], responder=lambda prompt: random.choice("ABCD"))
+    else:
+        backend = llm.GeminiBackend(llm_settings["api_key"])
+    rate = llm_settings["rate"]
+    _client = llm.LLMClient(backend, rate_per_second=rate, burst=max(1, int(rate)), max_concurrency=1)
+
+# Function to play one full game; returns the final company, correct answers and bankruptcy round (0 if none)
+def play_game(policy, difficulty, rounds, rng):
+    company = dict(default_company)
+    initial = dict(company)
+    correct_answers = 0
+    for round_number in range(rounds):
+        challenge = game.create_fallback_challenge(company, difficulty, rng)
+        choice = policy(company, initial, challenge, rng)
+        correct_answers += choice == challenge["correct_option"]
+        if game.apply_decision(company, choice, challenge["correct_option"], difficulty, rng):
+            return company, correct_answers, round_number + 1
+    return company, correct_answers, 0
+
+# Function to play one chunk of games in a worker and return its aggregates
+def play_chunk(policy_name, difficulty, chunk, games, rounds, seed):
+    rng = random.Random(f"{seed}:{policy_name}:{difficulty}:{chunk}")
+    policy = policies[policy_name]
+    result = {
+        "policy": policy_name, "difficulty": difficulty, "chunk": chunk, "games": games,
+        "bankruptcies": 0, "correct_answers": 0, "rounds_played": 0,
+        "final": dict.fromkeys(game.metrics, 0.0), "scores": []
+    }
+    for _ in range(games):
+        company, correct_answers, bankrupt_round = play_game(policy, difficulty, rounds, rng)
+        result["bankruptcies"] += bankrupt_round > 0
+        result["correct_answers"] += correct_answers
+        result["rounds_played"] += bankrupt_round or rounds
+        for metric in game.metrics:
+            result["final"][metric] += company[metric]
+        result["scores"].append(game.game_score(company, default_company, bankrupt_round))
+    return result
+
+# Function to play every policy at every difficulty, yielding chunk results as they complete
+def run_tournament(policy_names, difficulties, games, rounds=game.default_rounds, seed=0, workers=None, chunk_games=250, llm_settings=None):
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(llm_settings,)) as executor:
+        # Chunk-major submission so early results already cover every policy and difficulty
+        futures = [
+            executor.submit(play_chunk, policy_name, difficulty, chunk, min(chunk_games, games - start), rounds, seed)
+            for chunk, start in enumerate(range(0, games, chunk_games))
+            for policy_name in policy_names
+            for difficulty in difficulties
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+class Leaderboard:
+    """Running per-(difficulty, policy) totals folded from chunk results."""
+
+    def __init__(self):
+        self.totals = {}
+
+    def add(self, result):
+        totals = self.totals.setdefault((result["difficulty"], result["policy"]), {
+            "games": 0, "bankruptcies": 0, "correct_answers": 0, "rounds_played": 0,
+            "final": dict.fromkeys(game.metrics, 0.0), "scores": array("d")
+        })
+        for key in ("games", "bankruptcies", "correct_answers", "rounds_played"):
+            totals[key] += result[key]
+        for metric, value in result["final"].items():
+            totals["final"][metric] += value
+        totals["scores"].extend(result["scores"])
+
+    # Policies per difficulty, best mean score first
+    def ranking(self):
+        board = {}
+        for (difficulty, policy_name), totals in self.totals.items():
+            games = totals["games"]
+            scores = np.frombuffer(totals["scores"], dtype=np.float64)
+            board.setdefault(difficulty, []).append({
+                "policy": policy_name,
+                "games": games,
+                "score_mean": float(scores.mean()),
+                "score_p50": float(np.percentile(scores, 50)),
+                "bankruptcy_rate": totals["bankruptcies"] / games,
+                "correct_rate": totals["correct_answers"] / totals["rounds_played"],
+                **{f"{metric}_mean": value / games for metric, value in totals["final"].items()}
+            })
+        return {
+            difficulty: sorted(board[difficulty], key=lambda entry: entry["score_mean"], reverse=True)
+            for difficulty in game.difficulties if difficulty in board
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Leaderboard of automated CEO policies per difficulty")
+    parser.add_argument("--games", type=int, default=1000, help="games per policy and difficulty")
+    parser.add_argument("--rounds", type=int, default=game.default_rounds)
+    parser.add_argument("--policy", choices=list(policies), action="append", help="default: every policy except llm")
+    parser.add_argument("--difficulty", choices=game.difficulties, action="append")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-games", type=int, default=250, help="games per pool task")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="append each chunk result to this JSONL file as it completes")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"))
+    parser.add_argument("--stub", action="store_true", help="run the llm policy on the offline stub backend")
+    parser.add_argument("--rate", type=float, default=5.0, help="total LLM requests per second across workers")
+    args = parser.parse_args()
+    policy_names = args.policy or [name for name in policies if name != "llm"]
+    difficulties = args.difficulty or game.difficulties
+
+    llm_settings = None
+    if "llm" in policy_names:
+        if not args.stub and not args.api_key:
+            parser.error("--api-key (or GEMINI_API_KEY) is required for the llm policy unless --stub is given")
+        llm_settings = {"backend": "stub" if args.stub else "gemini", "api_key": args.api_key,
+                        "latency": 0.0, "rate": args.rate / max(1, args.workers)}
+
+    leaderboard = Leaderboard()
+    total = len(policy_names) * len(difficulties) * -(-args.games // args.chunk_games)
+    started = time.perf_counter()
+    out = open(args.out, "a", encoding="utf-8") if args.out else None
+    try:
+        for done, result in enumerate(run_tournament(policy_names, difficulties, args.games, args.rounds, args.seed,
+                                                     args.workers, args.chunk_games, llm_settings), 1):
+            leaderboard.add(result)
+            if out:
+                out.write(json.dumps(result) + "\n")
+            print(f"[{done}/{total}] {result['policy']} {result['difficulty']} chunk {result['chunk']}", file=sys.stderr)
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - started
+    games_played = len(policy_names) * len(difficulties) * args.games
+    print(json.dumps({
+        "config": vars(args) | {"api_key": None},
+        "elapsed_seconds": elapsed,
+        "games_per_second": games_played / elapsed,
+        "leaderboard": leaderboard.ranking()
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()